@@ -0,0 +1,178 @@
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+from cache import LRUCache
+from database import fetch_latest_rows, register_ingest_listener, thresholds_version
+from thresholds import current_thresholds
+
+# Alerts are tracked per (product, location)
+KEY_COLUMNS = ['Product Sold', 'Location']
+ALERT_SOURCE_COLUMNS = KEY_COLUMNS + ['Stock levels', 'Reorder Levels', 'Date Sold']
+
+# Oldest change-log entries are dropped beyond this many
+MAX_CHANGE_LOG = 100000
+
+
+# Function applying the one low-stock rule used everywhere: stock at or below the reorder level
+def is_low_stock(stock, reorder_level):
+    return stock <= reorder_level
+
+
+# Low-stock state per (product, location), updated incrementally instead of rescanning every rerun
+# Each key holds its latest stock snapshot (by 'Date Sold') and its reorder level
+class AlertEngine:
+    def __init__(self):
+        index = pd.MultiIndex.from_arrays([[], []], names=KEY_COLUMNS)
+        self.state = pd.DataFrame({'stock': pd.Series(dtype='float64'), 'reorder': pd.Series(dtype='float64'),
+                                   'as_of': pd.Series(dtype='datetime64[ns]'), 'low': pd.Series(dtype='bool')},
+                                  index=index)
+        self.thresholds_version = None
+        self.sequence = 0
+        self._log_sequence = []
+        self._log_keys = []
+        self._lock = threading.Lock()
+
+    # Function to record which keys flipped in or out of the low-stock set
+    def _log_changes(self, keys):
+        if not len(keys):
+            return
+        self.sequence += 1
+        self._log_sequence.extend([self.sequence] * len(keys))
+        self._log_keys.extend(keys)
+        if len(self._log_keys) > MAX_CHANGE_LOG:
+            del self._log_sequence[:-MAX_CHANGE_LOG]
+            del self._log_keys[:-MAX_CHANGE_LOG]
+
+    # Function to make an independent engine with the same state and change log
+    def copy(self):
+        engine = AlertEngine()
+        with self._lock:
+            engine.state = self.state.copy()
+            engine.thresholds_version = self.thresholds_version
+            engine.sequence = self.sequence
+            engine._log_sequence = list(self._log_sequence)
+            engine._log_keys = list(self._log_keys)
+        return engine
+
+    # Function to write updated rows into the state and log low-stock flips
+    def _apply(self, updates):
+        previous_low = self.state['low'].reindex(updates.index, fill_value=False)
+        updates = updates.assign(low=is_low_stock(updates['stock'], updates['reorder']))
+        self.state = pd.concat([self.state.drop(updates.index, errors='ignore'), updates])
+        self._log_changes(list(updates.index[updates['low'].to_numpy() != previous_low.to_numpy()]))
+
+    # Function to fold newly ingested or added rows into the state
+    # thresholds is a ThresholdTable; by default the stored thresholds are used
+    def ingest(self, df, thresholds=None):
+        df = df.reindex(columns=ALERT_SOURCE_COLUMNS)
+        rows = pd.DataFrame({col: df[col].astype(object) for col in KEY_COLUMNS})
+        rows['stock'] = pd.to_numeric(df['Stock levels'], errors='coerce').to_numpy()
+        rows['reorder'] = pd.to_numeric(df['Reorder Levels'], errors='coerce').to_numpy()
+        rows['as_of'] = pd.to_datetime(df['Date Sold'], errors='coerce').to_numpy()
+
+        # Latest row per key within the batch (undated rows count as the most recent)
+        rows = rows.sort_values('as_of', kind='stable', na_position='last')
+        latest = rows.drop_duplicates(KEY_COLUMNS, keep='last').set_index(KEY_COLUMNS)
+
+        # User-set thresholds win over the reorder level carried by transaction rows; they are resolved
+        # per key, so product-wide levels also cover (product, location) keys seen for the first time
+        table = thresholds if thresholds is not None else current_thresholds()
+        latest['reorder'] = table.lookup(latest.index.get_level_values(0), latest.index.get_level_values(1),
+                                         latest['reorder'].to_numpy())
+
+        with self._lock:
+            current = self.state['as_of'].reindex(latest.index)
+            newer = current.isna() | latest['as_of'].isna() | (latest['as_of'] >= current)
+            self._apply(latest[newer.to_numpy()])
+
+    # Function to apply reorder thresholds (a ThresholdTable) to every key already tracked
+    def set_thresholds(self, table):
+        with self._lock:
+            keys = self.state.index
+            levels = table.lookup(keys.get_level_values(0), keys.get_level_values(1), np.full(len(keys), np.nan))
+            found = ~np.isnan(levels)
+            if found.any():
+                updates = self.state.loc[found, ['stock', 'reorder', 'as_of']].copy()
+                updates['reorder'] = levels[found]
+                self._apply(updates)
+
+    # Function to bring the engine in line with the stored thresholds when they have changed
+    def sync_thresholds(self):
+        version = thresholds_version()
+        if self.thresholds_version != version:
+            table = current_thresholds()
+            if len(table):
+                self.set_thresholds(table)
+            self.thresholds_version = version
+        return self
+
+    # Function to get the current low-stock set as one table, largest shortfall first
+    def low_stock(self):
+        low = self.state[self.state['low']]
+        table = pd.DataFrame({
+            'Current Stock': low['stock'],
+            'Reorder Level': low['reorder'],
+            'Shortfall': low['reorder'] - low['stock'],
+        }).reset_index()
+        return table.sort_values('Shortfall', ascending=False, ignore_index=True)
+
+    # Function to count the (product, location) pairs that need reordering
+    def pending_count(self):
+        return int(self.state['low'].sum())
+
+    # Function to list the keys that entered or left the low-stock set after a given sequence number
+    def changes_since(self, sequence):
+        with self._lock:
+            start = bisect.bisect_right(self._log_sequence, sequence)
+            keys = list(dict.fromkeys(self._log_keys[start:]))
+            low = self.state['low'].reindex(pd.MultiIndex.from_tuples(keys, names=KEY_COLUMNS)) if keys else None
+        if not keys:
+            return pd.DataFrame(columns=KEY_COLUMNS + ['Status'])
+        changes = low.reset_index()
+        changes['Status'] = changes['low'].map({True: 'New alert', False: 'Resolved'})
+        return changes[KEY_COLUMNS + ['Status']]
+
+
+# Engines are kept per data source: 'database' is shared and updated on ingestion, uploads get their own
+MAX_CACHED_ENGINES = 64
+
+_engines = LRUCache(MAX_CACHED_ENGINES)
+
+# Function to build an engine from a DataFrame
+def build_engine(df, thresholds=None):
+    engine = AlertEngine()
+    engine.ingest(df, thresholds)
+    return engine
+
+# Function to get the process-wide engine over inventory_data (built once, then kept up to date)
+# through limits the initial build to rows up to a watermark; later rows arrive through ingestion
+# MySQL picks the latest row per key, so the build reads one row per (product, location), not every row
+def database_engine(through=None):
+    engine = _engines.get_or_build('database', lambda: build_engine(
+        fetch_latest_rows(ALERT_SOURCE_COLUMNS, KEY_COLUMNS, through=through)))
+    return engine.sync_thresholds()
+
+# Function to get the engine for an uploaded dataset version
+# load_frame is called for the dataset only when the engine has to be built
+def dataset_engine(version, load_frame):
+    return _engines.get_or_build(('dataset', version), lambda: build_engine(load_frame())).sync_thresholds()
+
+# Function to feed rows written to inventory_data into the shared engine (if it has been built)
+def _on_ingest(df):
+    engine = _engines.peek('database')
+    if engine is not None:
+        engine.ingest(df)
+
+register_ingest_listener(_on_ingest)
+
+# Function to carry a dataset's engine over to a new version, folding in only the new rows
+# The old version's engine may be shared with other sessions, so the new rows go into a copy
+def extend_dataset_engine(old_version, new_version, new_rows):
+    cached = _engines.peek(('dataset', old_version))
+    if cached is None:
+        return None
+    engine = cached.copy()
+    engine.ingest(new_rows)
+    _engines.put(('dataset', new_version), engine)
+    return engine
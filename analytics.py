@@ -0,0 +1,69 @@
+import itertools
+import pandas as pd
+
+# Filter value meaning "no filter" on a dimension
+ALL = 'All'
+
+# Chart per report type: (x-axis column, bar color, title)
+REPORT_CHARTS = {
+    "Monthly": ('Month', 'blue', 'Monthly Sales Revenue'),
+    "Seasonal": ('Season', 'green', 'Seasonal Sales Revenue'),
+    "Yearly": ('Year', 'orange', 'Yearly Sales Revenue'),
+    "Inventory Performance": ('Product Sold', 'purple', 'Inventory Performance'),
+}
+
+REPORT_TYPES = list(REPORT_CHARTS)
+
+
+# Function to compute the Dashboard aggregates from the cube
+def dashboard_summaries(cube):
+    return {
+        'total_products': len(cube.dimension_values('Product Sold')),
+        'monthly_revenue': cube.rollup(['Month'], sums=['Total Revenue']),
+        'predicted_sales': cube.rollup(['Month'], means=['Predicted Sales']).set_index('Month')['Predicted Sales'],
+        'product_profit': cube.rollup(['Product Sold'], means=['Profit']),
+        'stock_levels': cube.rollup(['Product Sold'], sums=['Stock levels']),
+    }
+
+# Function to compute the Sales Trends aggregates from the cube
+def sales_trend_summaries(cube):
+    segment = cube.rollup(['Customer Segment', 'Month'], sums=['Total Revenue', 'Purchase Frequency(Monthly)'])
+    return {
+        'monthly_sales': cube.rollup(['Month'], sums=['Total Revenue']),
+        'sales_growth': cube.rollup(['Month'], means=['Sales Growth Rate']),
+        'segment_revenue': segment[['Customer Segment', 'Month', 'Total Revenue']],
+        'segment_frequency': segment[['Customer Segment', 'Month', 'Purchase Frequency(Monthly)']],
+    }
+
+# Function to build the Reporting filters ('All' leaves a dimension unfiltered)
+# Year is a cube dimension; row queries turn it into a Date Sold range
+def report_filters(month=ALL, season=ALL, location=ALL, year=ALL):
+    return {'Month': month, 'Season': season, 'Location': location, 'Year': year}
+
+# Function to compute a Reporting summary from the cube for the selected filters
+def report_summary(cube, report_type, filters):
+    if report_type == "Monthly":
+        return cube.rollup(['Month', 'Location'], sums=['Total Revenue', 'quantity sold'], counts=['Rows'],
+                           filters=filters).rename(columns={'Rows': 'Product Sold'})
+    if report_type == "Seasonal":
+        return cube.rollup(['Season', 'Location'], sums=['Total Revenue', 'quantity sold'], counts=['Rows'],
+                           filters=filters).rename(columns={'Rows': 'Product Sold'})
+    if report_type == "Yearly":
+        total_revenue_2023 = cube.total('Total Revenue', dict(filters, Year=2023))
+        total_revenue_2024 = total_revenue_2023 * 1.1  # Simulate 10% growth for the next year
+        return pd.DataFrame({
+            'Year': [2023, 2024],
+            'Total Revenue': [total_revenue_2023, total_revenue_2024]
+        })
+    return cube.rollup(['Product Sold'], sums=['quantity sold', 'Total Revenue'], filters=filters)
+
+# Function to order a report summary for display and export (highest revenue first)
+def report_table(summary):
+    return summary.sort_values(by='Total Revenue', ascending=False)
+
+# Function to list every (report type, month, season, location) the Reporting page can produce
+def report_combinations(cube, report_types=REPORT_TYPES):
+    months = [ALL] + cube.dimension_values('Month')
+    seasons = [ALL] + cube.dimension_values('Season')
+    locations = [ALL] + cube.dimension_values('Location')
+    return list(itertools.product(report_types, months, seasons, locations))
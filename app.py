@@ -1,24 +1,52 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt  
 import numpy as np
 import hashlib
+import hmac
 import os
-import mysql.connector
-from fpdf import FPDF
+from datetime import datetime
+from loader import MONTH_ORDER, prepare_inventory_frame, describe_memory, align_rows, concat_rows
+from database import (
+    get_connection, get_pool, fetch_columns, iter_columns, fetch_account, load_user_dataset, dataset_hash, inventory_version,
+    upsert_thresholds, thresholds_version, append_inventory_rows, append_user_dataset_segment,
+    compact_user_dataset, COMPACT_AFTER_SEGMENTS, WATERMARK_COLUMN, DATAFRAME_COLUMNS
+)
+from rollup import get_cube, build_cube, build_cube_from_db, extend_cube
+from alerts import database_engine, dataset_engine, extend_dataset_engine
+from thresholds import current_thresholds
+from forecast import get_forecast
+from analytics import (
+    REPORT_CHARTS, REPORT_TYPES, dashboard_summaries, sales_trend_summaries, report_filters, report_summary,
+    report_table
+)
+from sync import shared_watermark, refresh_shared, fetch_session_delta, WATERMARK_TTL
+from excel_upload import (
+    file_hash, read_inventory_workbook, persist_in_background, persist_status, ingest_in_background, PREVIEW_ROWS
+)
+from jobs import submit_job, get_job, cancel_job, discard_job, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from pdf_report import cached_pdf_report
+from charts import cached_bar_chart
+from exports import (
+    EXPORT_FORMATS, build_export, frame_chunks, filtered_frame_chunks, export_file_name, export_mime
+)
+from inventory_index import InventoryIndex, INVENTORY_COLUMNS, page_count
+from perf import (
+    begin_rerun, end_rerun, span, percentiles, to_jsonl, start_metrics_server, ADMIN_USERS, METRICS_PORT
+)
 
 # Function to hash passwords
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-# Database connection setup
-def create_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",  # Adjust as per your MySQL credentials
-        password="root",  # Adjust as per your MySQL credentials
-        database="inventory_db"  # Your MySQL database name
-    )
+# Function to store a dataset in session state in its dtype-optimized form
+def set_session_data(data, source):
+    data, memory_report = prepare_inventory_frame(data)
+    st.session_state['data'] = data
+    st.session_state['data_tail'] = []
+    st.session_state['data_source'] = source
+    st.session_state['data_version'] = inventory_version() if source == 'database' else dataset_hash(data)
+    st.caption(describe_memory(memory_report))
+    return data
 
 # Function for user login
 def login_page():
@@ -27,34 +55,29 @@ def login_page():
     password = st.text_input("Password", type="password")
 
     if st.button("Login", key="login_button"):
-        connection = create_connection()
-        cursor = connection.cursor(dictionary=True)
+        # One narrow query: password hash plus saved-dataset metadata, never the dataset itself
+        account = fetch_account(username)
 
-        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        user = cursor.fetchone()
-
-        if user and hash_password(password) == user['password_hash']:
+        if account and hmac.compare_digest(hash_password(password), account['password_hash']):
             st.success(f"Welcome {username}!")
             st.session_state['logged_in'] = True
             st.session_state['current_user'] = username
-
-            try:
-                cursor.execute("SELECT * FROM datasets WHERE username = %s", (username,))
-                dataset = cursor.fetchone()
-
-                if dataset:
-                    st.session_state['data'] = pd.read_json(dataset['data'])
-                    st.success("Loaded your previously uploaded dataset from the database.")
-                else:
-                    st.warning("No dataset found. Please upload your data.")
-                    st.session_state['data'] = None  # Placeholder if no dataset in DB
-            except Exception as e:
-                st.warning("")
-                st.session_state['data'] = None
-
+            st.session_state['data'] = None
+
+            saved = account['dataset']
+            if saved is not None:
+                # Restored in the background; the first page that needs the data picks it up
+                st.session_state['saved_dataset'] = saved
+                st.session_state['restore_job'] = submit_job(
+                    "Load saved dataset", restore_job, username, owner=username,
+                    dedupe_key=('restore', username, saved['version']), once=True
+                )
+                size = f" ({saved['size_bytes'] / 1e6:,.1f} MB)" if saved['size_bytes'] else ""
+                st.info(f"Your saved dataset{size} is loading in the background.")
+            else:
+                st.warning("No dataset found. Please upload your data.")
         else:
             st.error("Incorrect username or password.")
-        connection.close()
 
 # Function for user signup
 def signup_page():
@@ -67,28 +90,261 @@ def signup_page():
         if new_password != confirm_password:
             st.error("Passwords do not match.")
         else:
-            connection = create_connection()
-            cursor = connection.cursor()
+            with get_connection() as connection:
+                cursor = connection.cursor()
 
-            cursor.execute("SELECT * FROM users WHERE username = %s", (new_username,))
-            if cursor.fetchone():
-                st.error("Username already taken. Please choose another.")
-            else:
-                hashed_password = hash_password(new_password)
-                cursor.execute("INSERT INTO users (username, password_hash) VALUES (%s, %s)", 
-                               (new_username, hashed_password))
-                connection.commit()
-                st.success("Account created successfully! Please [log in](#).", unsafe_allow_html=True)
-
-            connection.close()
-
-# Function to fetch data from the database
-def fetch_data_from_db():
-    conn = create_connection()
-    query = "SELECT * FROM inventory_data"
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+                cursor.execute("SELECT * FROM users WHERE username = %s", (new_username,))
+                if cursor.fetchone():
+                    st.error("Username already taken. Please choose another.")
+                else:
+                    hashed_password = hash_password(new_password)
+                    cursor.execute("INSERT INTO users (username, password_hash) VALUES (%s, %s)", 
+                                   (new_username, hashed_password))
+                    connection.commit()
+                    st.success("Account created successfully! Please [log in](#).", unsafe_allow_html=True)
+                cursor.close()
+
+# Columns of inventory_data each row-level page reads
+PAGE_COLUMNS = {
+    "Inventory Monitoring": ['Product Sold', 'Location', 'Stock levels', 'Reorder Levels'],
+}
+
+# Function to fetch data from the database (only the requested columns, up to a watermark)
+def fetch_data_from_db(columns=None, through=None):
+    return fetch_columns(columns, through=through)
+
+# Function to make sure the session frame holds the columns a page needs
+def load_page_data(columns):
+    data = st.session_state.get('data')
+    if data is not None:
+        if st.session_state.get('data_source') != 'database':
+            return data
+        if all(col in data.columns for col in columns):
+            return data
+
+    # Widen the projection to keep the columns earlier pages already loaded (and the watermark column)
+    if data is not None:
+        columns = list(dict.fromkeys(list(data.columns) + columns))
+    columns = list(dict.fromkeys(columns + [WATERMARK_COLUMN]))
+    watermark = session_watermark()
+    data = set_session_data(fetch_data_from_db(columns, through=watermark), 'database')
+    st.session_state['watermark'] = watermark
+    st.success("The data was loaded successfully from the database!")
+    return data
+
+# Function to get the watermark a session reads inventory_data up to
+# A session's first read folds in rows added since the shared watermark was last checked (at most one MAX() lookup
+# every WATERMARK_TTL seconds); after that the session keeps its view until it asks for a refresh
+def session_watermark():
+    if not st.session_state.get('watermark_checked'):
+        refresh_shared(max_age=WATERMARK_TTL)
+        st.session_state['watermark_checked'] = True
+    return shared_watermark()
+
+# Function to check whether the session reads straight from inventory_data
+def uses_database():
+    return st.session_state.get('data') is None or st.session_state.get('data_source') == 'database'
+
+# Function to get the version token of the dataset the session is looking at
+def current_data_version():
+    return inventory_version() if uses_database() else st.session_state['data_version']
+
+# Columns expected in a bulk thresholds file
+THRESHOLD_FILE_COLUMNS = ['Product Sold', 'Location', 'Reorder Levels']
+
+# Function to get the rollup cube for the session's dataset (built once per dataset version)
+def current_cube():
+    with span('cube.get'):
+        if uses_database():
+            through = session_watermark()
+            return get_cube(inventory_version(), lambda: build_cube_from_db(through=through))
+        return get_cube(st.session_state['data_version'], lambda: build_cube(session_frame()))
+
+# Function to get the low-stock alert engine for the session's dataset
+def current_alert_engine():
+    with span('alerts.get'):
+        if uses_database():
+            return database_engine(through=session_watermark())
+        return dataset_engine(st.session_state['data_version'], session_frame)
+
+# Function to get the demand forecast for the session's dataset (computed once per dataset version)
+def current_forecast():
+    with span('forecast.get'):
+        return get_forecast(current_data_version(), current_cube, lambda: current_alert_engine().state['stock'])
+
+# Function to append new rows to the session's dataset without rewriting anything already stored
+# Rows go to inventory_data with an INSERT, or to an append-only segment of an uploaded dataset;
+# the cube and alerts are extended with just the new rows, and the rows are held as a tail segment of the
+# in-memory frame, folded in when a page needs every row or once COMPACT_AFTER_SEGMENTS have piled up
+def append_session_rows(new_rows):
+    old_version = current_data_version()
+    if uses_database():
+        # The rows get their Transaction_IDs from the table, so they are folded in through the watermark
+        append_inventory_rows(new_rows)
+        refresh_from_database()
+        return current_data_version()
+
+    username = st.session_state['current_user']
+    if append_user_dataset_segment(username, new_rows) >= COMPACT_AFTER_SEGMENTS:
+        submit_job("Compact dataset", compact_job, username, owner=username, dedupe_key=('compact', username))
+    new_version = hashlib.sha256((old_version + dataset_hash(new_rows)).encode()).hexdigest()
+    extend_dataset_engine(old_version, new_version, new_rows)
+    extend_cube(old_version, new_version, new_rows)
+    extend_session_frame(new_rows, new_version)
+    return new_version
+
+# Function run as a background job: load a user's saved dataset (base blob plus appended segments)
+def restore_job(job, username):
+    job.report(0.0, "Loading saved dataset")
+    return load_user_dataset(username)
+
+# Function to bring the saved dataset into the session the first time a page needs it
+# Waits for the background load started at login (or starts one if it was dropped)
+def restore_saved_dataset():
+    saved = st.session_state.get('saved_dataset')
+    if saved is None:
+        return
+    username = st.session_state['current_user']
+    job = get_job(st.session_state.get('restore_job'))
+    if job is None:
+        job = get_job(submit_job("Load saved dataset", restore_job, username, owner=username,
+                                 dedupe_key=('restore', username, saved['version']), once=True))
+    with st.spinner("Loading your saved dataset..."):
+        job.wait()
+
+    st.session_state.pop('saved_dataset', None)
+    st.session_state.pop('restore_job', None)
+    discard_job(job.job_id)
+    if job.status == DONE and job.result is not None:
+        set_session_data(job.result, 'upload')
+        st.success("Loaded your previously uploaded dataset from the database.")
+    else:
+        st.warning("Unable to load your saved dataset. Please upload your data.")
+
+# Function run as a background job: fold a user's appended segments back into the base blob
+def compact_job(job, username):
+    return compact_user_dataset(username)
+
+# Function to show a background job's progress with a cancel button; returns the job (None if unknown)
+def show_job(job_id, key):
+    job = get_job(job_id)
+    if job is None:
+        return None
+    if job.status in (QUEUED, RUNNING):
+        st.progress(job.progress, text=job.message or f"{job.name} {job.status}...")
+        col1, col2 = st.columns(2)
+        with col1:
+            # Any interaction reruns the script, which polls the job again
+            st.button("Check progress", key=f"{key}_refresh")
+        with col2:
+            if st.button("Cancel", key=f"{key}_cancel"):
+                cancel_job(job_id)
+                st.info(f"Cancelling {job.name.lower()}...")
+    elif job.status == FAILED:
+        st.error(f"{job.name} failed: {job.error}")
+    elif job.status == CANCELLED:
+        st.warning(f"{job.name} was cancelled.")
+    return job
+
+# Function run as a background job: build a report's summary, chart and PDF (CSV is built on download)
+def build_report_job(job, cube, report_type, filters, report_key):
+    job.report(0.1, "Summarizing sales")
+    sales_summary = report_summary(cube, report_type, filters)
+
+    job.report(0.3, "Drawing chart")
+    x_column, color, chart_title = REPORT_CHARTS[report_type]
+    chart = cached_bar_chart(report_key, sales_summary[x_column], sales_summary['Total Revenue'],
+                             chart_title, x_column, 'Total Revenue', color)
+
+    # Sort the report by 'Total Revenue' in descending order
+    sales_summary = report_table(sales_summary)
+
+    job.report(0.5, "Rendering PDF")
+    pdf_data = cached_pdf_report(report_key, f"{report_type} Sales Report", sales_summary)
+    return {'summary': sales_summary, 'chart': chart, 'pdf': pdf_data}
+
+# Function to add new rows to the session's dataset as a tail segment, without copying the rows already held
+# The tails are folded into the frame when a page needs every row, or once COMPACT_AFTER_SEGMENTS have piled up
+def extend_session_frame(new_rows, new_version):
+    data = st.session_state.get('data')
+    if data is not None:
+        tail = st.session_state.get('data_tail', []) + [align_rows(data, new_rows)]
+        st.session_state['data_tail'] = tail
+        st.session_state['data_version'] = new_version
+        if len(tail) >= COMPACT_AFTER_SEGMENTS:
+            session_frame()
+
+# Function to get the session's whole dataset, folding any pending tail segments into it first
+# An inventory index built over the frame is extended with just the tail rows
+def session_frame():
+    data = st.session_state.get('data')
+    tail = st.session_state.get('data_tail')
+    if data is None or not tail:
+        return data
+    with span('data.compact', rows=sum(len(rows) for rows in tail)):
+        full = concat_rows([data] + tail)
+    st.session_state['data'] = full
+    st.session_state['data_tail'] = []
+    cached = st.session_state.get('inventory_index')
+    if cached is not None and cached[1].df is data:
+        st.session_state['inventory_index'] = (st.session_state['data_version'],
+                                               cached[1].extend(full, current_thresholds()))
+    return full
+
+# Function to list the session's dataset as the frame and its pending tail segments (nothing is copied)
+def session_frames():
+    data = st.session_state.get('data')
+    return [] if data is None else [data] + st.session_state.get('data_tail', [])
+
+# Function to pull only the rows added to inventory_data since the last refresh
+def refresh_from_database():
+    added, watermark = refresh_shared()
+    data = st.session_state.get('data')
+    if data is not None and st.session_state.get('data_source') == 'database':
+        new_rows = fetch_session_delta(list(data.columns), st.session_state.get('watermark'), watermark)
+        if new_rows is not None and len(new_rows):
+            extend_session_frame(new_rows, inventory_version())
+        st.session_state['watermark'] = watermark
+    return added
+
+# Function to build inventory rows for products added by hand: (name, quantity, price, location) tuples
+def new_product_rows(products):
+    now = datetime.now()
+    rows = pd.DataFrame(list(products), columns=['Product Sold', 'quantity sold', 'price per product', 'Location'])
+    rows['Total Revenue'] = rows['quantity sold'] * rows['price per product']
+    rows['Date Sold'] = pd.Timestamp(now)
+    rows['Month'] = now.strftime('%B')
+    return rows
+
+# Function to get the session's inventory group index, rebuilt only when the dataset changes
+def current_inventory_index(data):
+    cached = st.session_state.get('inventory_index')
+    if cached is None or cached[0] != st.session_state.get('data_version') or cached[1].df is not data:
+        cached = (st.session_state.get('data_version'), InventoryIndex(data))
+        st.session_state['inventory_index'] = cached
+
+    # Stored thresholds are joined onto the rows only when they have changed
+    return cached[1].apply_thresholds(current_thresholds(), thresholds_version())
+
+# Function to render one sortable page of the selected inventory rows
+def show_inventory_page(index, positions, key):
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        sort_by = st.selectbox("Sort by", INVENTORY_COLUMNS, key=f"{key}_sort")
+    with col2:
+        ascending = st.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Ascending"
+    with col3:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 500], key=f"{key}_page_size")
+    total_pages = page_count(len(positions), page_size)
+    with col4:
+        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, key=f"{key}_page") - 1
+
+    # Only the requested page is materialized and sent to the browser
+    rows = index.page(positions, page, page_size, sort_by=sort_by, ascending=ascending)
+    with span('streamlit.dataframe', rows=len(rows)):
+        st.dataframe(rows)
+    first_row = page * page_size + 1 if len(positions) else 0
+    st.caption(f"Showing rows {first_row}–{min((page + 1) * page_size, len(positions))} of {len(positions)}")
 
 # Dataset upload and persistence
 def upload_dataset_page():
@@ -96,22 +352,64 @@ def upload_dataset_page():
     uploaded_file = st.file_uploader("Choose an Excel file", type="xlsx")
 
     if uploaded_file is not None:
-        data = pd.read_excel(uploaded_file)
-        st.session_state['data'] = data
-        st.success("Data loaded successfully from uploaded file!")
-        st.dataframe(data)
-
-        connection = create_connection()
-        cursor = connection.cursor()
-        cursor.execute(
-            "INSERT INTO datasets (username, data) VALUES (%s, %s) ON DUPLICATE KEY UPDATE data=%s", 
-            (st.session_state['current_user'], data.to_json(), data.to_json())
-        )
-        connection.commit()
-        connection.close()
+        username = st.session_state['current_user']
+        upload_hash = file_hash(uploaded_file)
+
+        # Parse only when a new file is uploaded, not on every rerun while it stays in the uploader
+        if st.session_state.get('upload_hash') != upload_hash:
+            progress = st.progress(0.0, text="Reading workbook...")
+
+            def report_progress(rows_read, total_rows):
+                fraction = min(rows_read / total_rows, 1.0) if total_rows else 1.0
+                progress.progress(fraction, text=f"Read and validated {rows_read:,} rows")
+
+            try:
+                data, problems = read_inventory_workbook(uploaded_file, progress_callback=report_progress)
+            except ValueError as e:
+                progress.empty()
+                st.error(str(e))
+                return
+
+            for problem in problems:
+                st.warning(problem)
+            data = set_session_data(data, 'upload')
+            st.session_state['upload_hash'] = upload_hash
+
+            # The new upload replaces the saved dataset, so a restore still pending from login is dropped
+            if st.session_state.pop('saved_dataset', None) is not None:
+                restore = st.session_state.pop('restore_job', None)
+                cancel_job(restore)
+                discard_job(restore)
+            st.success("Data loaded successfully from uploaded file!")
+
+            # Stored as compressed Parquet in the background; an identical re-upload is not written again
+            persist_in_background(username, upload_hash, data)
+        else:
+            data = session_frame()
+
+        status = persist_status(username, upload_hash)
+        if status == 'running':
+            st.info("Saving dataset to your account in the background...")
+        elif status == 'saved':
+            st.success("Dataset saved to your account.")
+        elif status and status.startswith('failed'):
+            st.error(f"Saving the dataset {status}")
+
+        st.write(f"Preview of the first {min(PREVIEW_ROWS, len(data))} of {len(data):,} rows:")
+        st.dataframe(data.head(PREVIEW_ROWS))
+
+        # Importing into inventory_data runs as a background job (at most once per file)
+        if st.button("Import into inventory database"):
+            st.session_state['ingest_job'] = ingest_in_background(username, upload_hash, data)
+        ingest = show_job(st.session_state.get('ingest_job'), "ingest")
+        if ingest is not None and ingest.status == DONE:
+            st.success(f"Imported {ingest.result:,} rows into the inventory database.")
     else:
         st.warning("Please upload an Excel file if the database is not available.")
 
+# Optional local metrics endpoint (INVENTORY_METRICS_PORT), started once per process
+start_metrics_server(pool_stats=lambda: get_pool().snapshot())
+
 # Initialize session state
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -134,23 +432,31 @@ else:
 # Check if user is logged in
 if st.session_state['logged_in']:
     st.sidebar.title("Navigation")
-    options = st.sidebar.radio("Select a page:", (  
-        "Upload Dataset",  
-        "Dashboard",  
-        "Inventory Monitoring",  
-        "Sales Trends Analysis",  
-        "User Settings",  
-        "Reporting"  
-    ))  
+    if st.sidebar.button("🔄 Refresh data"):
+        try:
+            st.sidebar.success(f"{refresh_from_database()} new rows loaded.")
+        except Exception as e:
+            st.sidebar.warning("Unable to refresh data from the database.")
+    pages = ["Upload Dataset", "Dashboard", "Inventory Monitoring", "Sales Trends Analysis", "User Settings",
+             "Reporting"]
+    if st.session_state['current_user'] in ADMIN_USERS:
+        pages.append("Performance")
+    options = st.sidebar.radio("Select a page:", pages)
+
+    # Every span recorded until the end of this script run is attributed to the selected page
+    begin_rerun(options)
 
     if options == "Upload Dataset":
         upload_dataset_page()
+    else:
+        restore_saved_dataset()
 
-    # Fetch data from session state or database
-    if 'data' not in st.session_state or st.session_state['data'] is None:
+    # Fetch the columns this page needs from session state or database
+    data = None
+    if options in PAGE_COLUMNS:
         try:
-            st.session_state['data'] = fetch_data_from_db()
-            st.success("The data was loaded successfully from the database!")
+            with span('data.load'):
+                data = load_page_data(PAGE_COLUMNS[options])
         except Exception as e:
             st.warning("Unable to fetch data from the database. Please upload your dataset.")
 
@@ -204,60 +510,62 @@ if st.session_state['logged_in']:
         # Alerts & Notifications
         st.subheader("Alerts & Notifications")
 
-        # Filter products with low stock
-        low_stock_products = data[data['Stock levels'] < data['Reorder Levels']]
+        # Aggregates are read from the shared rollup cube instead of rescanning rows
+        cube = current_cube()
+        with span('summaries'):
+            summaries = dashboard_summaries(cube)
 
-        if not low_stock_products.empty:
-            # Group by 'Product Sold' and sum stock levels and reorder levels
-            grouped_low_stock = low_stock_products.groupby('Product Sold').agg(
-                Total_Current_Stock=('Stock levels', 'sum'),
-                Total_Reorder_Level=('Reorder Levels', 'sum')
-            ).reset_index()
+        # Low-stock set per (product, location), kept up to date by the alert engine
+        alert_engine = current_alert_engine()
+        low_stock_products = alert_engine.low_stock()
 
+        if not low_stock_products.empty:
             st.markdown('<p class="notification">⚠ Low stock for the following products:</p>', unsafe_allow_html=True)
-            for index, row in grouped_low_stock.iterrows():
-                st.markdown(f"- **{row['Product Sold']}**: Total Current Stock = {row['Total_Current_Stock']}, Total Reorder Level = {row['Total_Reorder_Level']}")
+            st.dataframe(low_stock_products)
         else:
             st.success("No alerts currently. All stock levels are sufficient!")
 
+        # Alerts that appeared or cleared since this session last viewed the Dashboard
+        if 'alerts_seen_sequence' in st.session_state:
+            changes = alert_engine.changes_since(st.session_state['alerts_seen_sequence'])
+            if not changes.empty:
+                new_alerts = int((changes['Status'] == 'New alert').sum())
+                st.info(f"Since your last visit: {new_alerts} new alerts, {len(changes) - new_alerts} resolved.")
+                with st.expander("Show changes"):
+                    st.dataframe(changes)
+        st.session_state['alerts_seen_sequence'] = alert_engine.sequence
+
 
         # Dashboard Statistics
         st.subheader("Dashboard Statistics")
         col1, col2 = st.columns(2)
         with col1:
-            st.markdown('<div class="dashboard-stat"><h4>Total Products</h4><p>{}</p></div>'.format(data['Product Sold'].nunique()), unsafe_allow_html=True)
+            st.markdown('<div class="dashboard-stat"><h4>Total Products</h4><p>{}</p></div>'.format(summaries['total_products']), unsafe_allow_html=True)
         with col2:
-            st.markdown('<div class="dashboard-stat"><h4>Pending Reorders</h4><p>{}</p></div>'.format(data[data['Stock levels'] <= data['Reorder Levels']].shape[0]), unsafe_allow_html=True)
+            st.markdown('<div class="dashboard-stat"><h4>Pending Reorders</h4><p>{}</p></div>'.format(alert_engine.pending_count()), unsafe_allow_html=True)
 
         # Charts for sales trends, predicted sales, product PEI, and current stock levels
         st.subheader("Sales Trends")
-        sales_data = data.groupby('Month')['Total Revenue'].sum().reset_index()
+        sales_data = summaries['monthly_revenue']
         st.line_chart(sales_data.set_index('Month'))
 
         #Predicted Sales from the dataset
         st.subheader("Predicted Sales")
 
-        # Define the correct order of months
-        month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-                    'July', 'August', 'September', 'October', 'November', 'December']
-
-        # Ensure 'Predicted Sales' column exists and remove NaN values
-        predicted_sales = data[['Month', 'Predicted Sales']].dropna()
-
-        # Group by 'Month' and calculate the mean of 'Predicted Sales', then reindex by month order
-        predicted_sales = predicted_sales.groupby('Month')['Predicted Sales'].mean().reindex(month_order)
+        # Mean of 'Predicted Sales' per month (NaN ignored), reindexed by month order
+        predicted_sales = summaries['predicted_sales'].reindex(MONTH_ORDER)
 
         # Plot the predicted sales as a line chart
         st.line_chart(predicted_sales)
 
         # Profit per Product (Product PEI)
         st.subheader("Profit per Product")
-        product_pei = data.groupby('Product Sold')['Profit'].mean().reset_index()
+        product_pei = summaries['product_profit']
         st.bar_chart(product_pei.set_index('Product Sold'))
 
         # Current Stock Levels
         st.subheader("Current Stock Levels")
-        st.bar_chart(data[['Product Sold', 'Stock levels']].set_index('Product Sold'))
+        st.bar_chart(summaries['stock_levels'].set_index('Product Sold'))
 
     # Inventory Monitoring and Management Page  
     elif options == "Inventory Monitoring":  
@@ -265,27 +573,23 @@ if st.session_state['logged_in']:
         st.write("Monitor and manage your inventory here.")
 
 
-        # Filters for inventory view
-        product_filter = st.selectbox("Filter by Product:", ['All'] + list(data['Product Sold'].unique()))
-        location_filter = st.selectbox("Filter by Location:", ['All'] + list(data['Location'].unique()))
+        # Filters are answered from prebuilt group indices (leave empty for all)
+        index = current_inventory_index(session_frame())
+        product_filter = st.multiselect("Filter by Product:", index.values('Product Sold'))
+        location_filter = st.multiselect("Filter by Location:", index.values('Location'))
         reorder_filter = st.checkbox("Show only products below reorder level")
 
         # Apply filters independently
-        filtered_data = data
-        if product_filter != 'All':
-            filtered_data = filtered_data[filtered_data['Product Sold'] == product_filter]
-        if location_filter != 'All':
-            filtered_data = filtered_data[filtered_data['Location'] == location_filter]
+        positions = index.select({'Product Sold': product_filter, 'Location': location_filter})
 
-        # Show filtered inventory
-        st.dataframe(filtered_data[['Product Sold', 'Location', 'Stock levels', 'Reorder Levels']])
+        # Show filtered inventory, one page at a time
+        show_inventory_page(index, positions, "inventory")
 
         # Reorder Alerts
         st.subheader("⚠ Reorder Alerts")
         if reorder_filter:
             st.warning("The following products need restocking:")
-            low_stock = filtered_data[filtered_data['Stock levels'] <= filtered_data['Reorder Levels']]
-            st.dataframe(low_stock[['Product Sold','Location','Stock levels', 'Reorder Levels']])
+            show_inventory_page(index, index.below_reorder(positions), "reorder")
 
 
     # Sales Trends Analysis Page
@@ -293,20 +597,24 @@ if st.session_state['logged_in']:
         st.title("📈 Sales Trends Analysis")
         st.write("Analyze your sales data over time.")
 
+        cube = current_cube()
+        with span('summaries'):
+            summaries = sales_trend_summaries(cube)
+
         # Monthly Sales Overview
-        monthly_sales = data.groupby('Month')['Total Revenue'].sum().reset_index()
+        monthly_sales = summaries['monthly_sales']
         st.bar_chart(monthly_sales.set_index('Month'))
 
         # Sales Growth Rate
         st.subheader("Sales Growth Rate")
-        sales_growth = data.groupby('Month')['Sales Growth Rate'].mean().reset_index()
+        sales_growth = summaries['sales_growth']
         st.line_chart(sales_growth.set_index('Month'))
 
         # Customer Segment Revenue Analysis
         st.subheader("Revenue by Customer Segment")
         
         # Aggregate data for customer segments
-        customer_segment_data = data.groupby(['Customer Segment', 'Month']).agg({'Total Revenue': 'sum'}).reset_index()
+        customer_segment_data = summaries['segment_revenue']
 
         # Create a pivot table for stacked bar chart
         pivot_revenue = customer_segment_data.pivot(index='Month', columns='Customer Segment', values='Total Revenue').fillna(0)
@@ -318,7 +626,7 @@ if st.session_state['logged_in']:
         st.subheader("Purchase Frequency by Customer Segment")
         
         # Aggregate purchase frequency data
-        purchase_frequency_data = data.groupby(['Customer Segment', 'Month']).agg({'Purchase Frequency(Monthly)': 'sum'}).reset_index()
+        purchase_frequency_data = summaries['segment_frequency']
 
         # Create a pivot table for purchase frequency
         pivot_frequency = purchase_frequency_data.pivot(index='Month', columns='Customer Segment', values='Purchase Frequency(Monthly)').fillna(0)
@@ -326,17 +634,52 @@ if st.session_state['logged_in']:
         # Stacked bar chart for purchase frequency by customer segment
         st.bar_chart(pivot_frequency)
 
+        # Demand forecast for every product and location, computed in one batch from the cube
+        st.subheader("Demand Forecast")
+        forecast = current_forecast()
+        st.line_chart(forecast.totals())
+
+        # Restock quantities cover the next forecast periods plus safety stock, less current stock
+        st.subheader("Restock Recommendations")
+        restock = forecast.restock_table()
+        if restock.empty:
+            st.success("Current stock covers the forecast demand.")
+        else:
+            st.dataframe(restock)
+
 
     # User Settings Page
     elif options == "User Settings":
         st.title("⚙ User Settings")
         st.write("Manage user-specific settings and thresholds here.")
 
-        # Stock threshold adjustment
+        # Stock threshold adjustment (stored per product and location, not written into transaction rows)
+        cube = current_cube()
+        all_products = cube.dimension_values('Product Sold')
+        threshold_product = st.selectbox("Product:", ['All products'] + all_products)
+        threshold_location = st.selectbox("Location:", ['All locations'] + cube.dimension_values('Location'))
         new_reorder_level = st.number_input("Set new reorder threshold level:", min_value=1)
+        st.caption("A threshold set for a specific location takes precedence over one set for all locations.")
         if st.button("Update Reorder Level"):
-            data['Reorder Levels'] = new_reorder_level
-            st.success(f"Reorder level updated to {new_reorder_level} for all products")
+            thresholds = pd.DataFrame({
+                'Product Sold': all_products if threshold_product == 'All products' else [threshold_product],
+                'Location': None if threshold_location == 'All locations' else threshold_location,
+                'Reorder Levels': new_reorder_level,
+            })
+            upsert_thresholds(thresholds)
+            st.success(f"Reorder level updated to {new_reorder_level} for {threshold_product.lower() if threshold_product == 'All products' else threshold_product}")
+
+        # Bulk threshold update from a CSV file
+        threshold_file = st.file_uploader("Bulk update thresholds (CSV with Product Sold, Location, Reorder Levels; "
+                                          "leave Location empty for all locations)", type="csv")
+        if threshold_file is not None and st.button("Apply Threshold File"):
+            thresholds = pd.read_csv(threshold_file)
+            missing = [col for col in THRESHOLD_FILE_COLUMNS if col not in thresholds.columns]
+            if missing:
+                st.error(f"Threshold file is missing columns: {', '.join(missing)}")
+            else:
+                updated = upsert_thresholds(thresholds[THRESHOLD_FILE_COLUMNS].dropna(subset=['Product Sold', 'Reorder Levels']))
+                st.success(f"Updated {updated} reorder thresholds.")
 
         # Manage product categories
         st.write("### Manage Product Categories")
@@ -358,159 +701,146 @@ if st.session_state['logged_in']:
         
         if st.button("Add Product"):
             if product_name and quantity > 0 and price >= 0:
-                new_product = {
-                    "Product Sold": product_name,
-                    "quantity sold": quantity,
-                    "Total Revenue": quantity * price,
-                    "Location": "Default Location"  # or any default you want
-                }
-                # Append new product to data
-                data = pd.concat([data, pd.DataFrame([new_product])], ignore_index=True)
+                # Append only the new record; nothing already stored is rewritten
+                append_session_rows(new_product_rows([(product_name, quantity, price, "Default Location")]))
                 st.success(f"Product '{product_name}' added successfully.")
             else:
                 st.error("Please fill in all fields correctly.")
 
-            # Save updated data to a persistent location in the 'data' folder
-            data.to_csv("data/inventory_data.csv", index=False)  # Update to use the 'data' folder
+        # Add many products at once
+        st.write("### Add Many Products")
+        new_products = st.data_editor(
+            pd.DataFrame({'Product Name': pd.Series(dtype='str'), 'Quantity': pd.Series(dtype='int'),
+                          'Price per Product': pd.Series(dtype='float'), 'Location': pd.Series(dtype='str')}),
+            num_rows="dynamic", key="new_products_editor"
+        )
+        if st.button("Add Products"):
+            new_products = new_products.dropna(subset=['Product Name', 'Quantity', 'Price per Product'])
+            valid = (new_products['Quantity'] > 0) & (new_products['Price per Product'] >= 0)
+            if new_products.empty or not valid.all():
+                st.error("Please fill in product name, a positive quantity and a price for every row.")
+            else:
+                append_session_rows(new_product_rows(zip(
+                    new_products['Product Name'], new_products['Quantity'], new_products['Price per Product'],
+                    new_products['Location'].fillna("Default Location")
+                )))
+                st.success(f"Added {len(new_products)} products.")
             
 
     # Reporting Page
     if options == "Reporting":
         st.title("📑 Reporting")
 
+        cube = current_cube()
+
         # Filters with "All" option
-        all_months = ['All'] + list(data['Month'].unique())
-        all_seasons = ['All'] + list(data['Season'].unique())
-        all_locations = ['All'] + list(data['Location'].unique())
+        all_months = ['All'] + cube.dimension_values('Month')
+        all_seasons = ['All'] + cube.dimension_values('Season')
+        all_locations = ['All'] + cube.dimension_values('Location')
+        all_years = ['All'] + [int(year) for year in cube.dimension_values('Year')]
 
         selected_month = st.selectbox("Select Month", all_months)
         selected_season = st.selectbox("Select Season", all_seasons)
         selected_location = st.selectbox("Select Location", all_locations)
+        selected_year = st.selectbox("Select Year", all_years)
 
         # Generate reports
         st.write("### Generate Sales Report")
-        report_type = st.selectbox("Select Report Type", ["Monthly", "Seasonal", "Yearly", "Inventory Performance"])
+        report_type = st.selectbox("Select Report Type", REPORT_TYPES)
 
         if st.button("Generate Report"):
-            # Filter data based on selected criteria
-            filtered_data = data.copy()
-
-            if selected_month != 'All':
-                filtered_data = filtered_data[filtered_data['Month'] == selected_month]
-            if selected_season != 'All':
-                filtered_data = filtered_data[filtered_data['Season'] == selected_season]
-            if selected_location != 'All':
-                filtered_data = filtered_data[filtered_data['Location'] == selected_location]
+            # Filter the cube based on selected criteria
+            filters = report_filters(selected_month, selected_season, selected_location, selected_year)
 
             # Ensure there's data to work with
-            if filtered_data.empty:
+            if cube.filter(filters).empty:
                 st.warning("No data available for the selected filters.")
+                st.session_state.pop('report_job', None)
             else:
-                if report_type == "Monthly":
-                    sales_summary = filtered_data.groupby(['Month', 'Location']).agg({
-                        'Total Revenue': 'sum',
-                        'quantity sold': 'sum',
-                        'Product Sold': 'count'
-                    }).reset_index()
-
-                    # Visualize monthly sales
-                    plt.figure(figsize=(10, 5))
-                    plt.bar(sales_summary['Month'], sales_summary['Total Revenue'], color='blue')
-                    plt.title('Monthly Sales Revenue')
-                    plt.xlabel('Month')
-                    plt.ylabel('Total Revenue')
-                    st.pyplot(plt)
-
-                elif report_type == "Seasonal":
-                    sales_summary = filtered_data.groupby(['Season', 'Location']).agg({
-                        'Total Revenue': 'sum',
-                        'quantity sold': 'sum',
-                        'Product Sold': 'count'
-                    }).reset_index()
-
-                    # Visualize seasonal sales
-                    plt.figure(figsize=(10, 5))
-                    plt.bar(sales_summary['Season'], sales_summary['Total Revenue'], color='green')
-                    plt.title('Seasonal Sales Revenue')
-                    plt.xlabel('Season')
-                    plt.ylabel('Total Revenue')
-                    st.pyplot(plt)
-
-                elif report_type == "Yearly":
-                    st.write("### 📅 Yearly Sales Report")
-                    total_revenue_2023 = filtered_data[filtered_data['Date Sold'].dt.year == 2023]['Total Revenue'].sum()
-                    total_revenue_2024 = total_revenue_2023 * 1.1  # Simulate 10% growth for the next year
-                    sales_summary = pd.DataFrame({
-                        'Year': [2023, 2024],
-                        'Total Revenue': [total_revenue_2023, total_revenue_2024]
-                    })
-
-                    # Visualize yearly sales
-                    plt.figure(figsize=(10, 5))
-                    plt.bar(sales_summary['Year'], sales_summary['Total Revenue'], color='orange')
-                    plt.title('Yearly Sales Revenue')
-                    plt.xlabel('Year')
-                    plt.ylabel('Total Revenue')
-                    st.pyplot(plt)
-
-                elif report_type == "Inventory Performance":
-                    sales_summary = filtered_data.groupby(['Product Sold']).agg({
-                        'quantity sold': 'sum',
-                        'Total Revenue': 'sum'
-                    }).reset_index()
-
-                    # Visualize inventory performance
-                    plt.figure(figsize=(10, 5))
-                    plt.bar(sales_summary['Product Sold'], sales_summary['Total Revenue'], color='purple')
-                    plt.title('Inventory Performance')
-                    plt.xlabel('Product Sold')
-                    plt.ylabel('Total Revenue')
-                    st.pyplot(plt)
-
-                # Sort the report by 'Total Revenue' in descending order
-                sales_summary = sales_summary.sort_values(by='Total Revenue', ascending=False)
-
-                # Display the report
-                st.dataframe(sales_summary)
-
-                # CSV download
-                csv_data = sales_summary.to_csv(index=False).encode('utf-8')
-                st.download_button("Download Report as CSV", data=csv_data, file_name=f"{report_type}_sales_report.csv", mime='text/csv')
-
-                # Download as PDF
-                if st.button("Download Report as PDF"):
-                    pdf = FPDF()
-                    pdf.add_page()
-                    pdf.set_font("Arial", size=12)
-
-                    # Add title
-                    pdf.cell(200, 10, txt=f"{report_type} Sales Report", ln=True, align='C')
-
-                    # Add table headers
-                    for col in sales_summary.columns:
-                        pdf.cell(40, 10, col, 1)
-                    pdf.ln()
-
-                    # Add table data
-                    for i in range(len(sales_summary)):
-                        for col in sales_summary.columns:
-                            pdf.cell(40, 10, str(sales_summary[col].iloc[i]), 1)
-                        pdf.ln()
-
-                    pdf_file_path = f"{report_type}_sales_report.pdf"
-                    pdf.output(pdf_file_path)
-
-                    with open(pdf_file_path, "rb") as f:
-                        st.download_button(
-                            label="Download Report as PDF",
-                            data=f,
-                            file_name=pdf_file_path,
-                            mime='application/pdf'
-                        )    
-
-                # Real-time Recommendations
-                st.write("### Recommendations")
-                st.info("To balance product performance:")
-                st.write("- Analyze sales trends to identify high-performing product categories.")
-                st.write("- Allocate marketing resources accordingly to boost sales for underperforming categories.")
-                st.write("- Regularly review inventory to avoid overstocking products with low demand.")
+                # Built in the background; the same report for the same dataset version is only built once
+                report_key = (current_data_version(), report_type, selected_month, selected_season, selected_location,
+                              selected_year)
+                job_id = submit_job("Report", build_report_job, cube, report_type, filters, report_key,
+                                    owner=st.session_state['current_user'], dedupe_key=('report',) + report_key,
+                                    once=True)
+                st.session_state['report_job'] = (job_id, report_type)
+
+        # Show the last requested report once its job has finished (on this or a later rerun)
+        report_job = st.session_state.get('report_job')
+        job = show_job(report_job[0], "report") if report_job else None
+        if job is not None and job.status == DONE:
+            shown_type = report_job[1]
+            result = job.result
+            if shown_type == "Yearly":
+                st.write("### 📅 Yearly Sales Report")
+
+            # Visualize the report (rendered off pyplot, cached per dataset version and filters)
+            st.image(result['chart'])
+
+            # Display the report
+            st.dataframe(result['summary'])
+
+            # Table download, encoded only when the button is clicked
+            summary_format = st.selectbox("Report table format", list(EXPORT_FORMATS), key="report_format")
+            summary = result['summary']
+            st.download_button(
+                f"Download Report as {summary_format}",
+                data=lambda: build_export(frame_chunks(summary), summary_format, f"{shown_type}_sales_report.csv",
+                                          empty=summary.iloc[:0]),
+                file_name=export_file_name(f"{shown_type}_sales_report", summary_format),
+                mime=export_mime(summary_format),
+                on_click="ignore"
+            )
+
+            # Download as PDF (rendered in memory, cached per dataset version and filters)
+            st.download_button(
+                label="Download Report as PDF",
+                data=result['pdf'],
+                file_name=f"{shown_type}_sales_report.pdf",
+                mime='application/pdf'
+            )
+
+            # Real-time Recommendations
+            st.write("### Recommendations")
+            st.info("To balance product performance:")
+            st.write("- Analyze sales trends to identify high-performing product categories.")
+            st.write("- Allocate marketing resources accordingly to boost sales for underperforming categories.")
+            st.write("- Regularly review inventory to avoid overstocking products with low demand.")
+
+        # Export the raw rows behind the selected filters, streamed in chunks when the download is clicked
+        st.write("### Export Filtered Rows")
+        export_format = st.selectbox("Export format", list(EXPORT_FORMATS), index=1, key="rows_format")
+        export_filters = report_filters(selected_month, selected_season, selected_location, selected_year)
+        if uses_database():
+            row_chunks = lambda: iter_columns(filters=export_filters)
+            no_rows = pd.DataFrame(columns=DATAFRAME_COLUMNS)
+        else:
+            frames = session_frames()
+            row_chunks = lambda: (chunk for frame in frames for chunk in filtered_frame_chunks(frame, export_filters))
+            no_rows = frames[0].iloc[:0]
+        st.download_button(
+            f"Download filtered rows as {export_format}",
+            data=lambda: build_export(row_chunks(), export_format, "inventory_rows.csv", empty=no_rows),
+            file_name=export_file_name("inventory_rows", export_format),
+            mime=export_mime(export_format),
+            on_click="ignore"
+        )
+
+    # Performance Page (admins only)
+    if options == "Performance" and st.session_state['current_user'] in ADMIN_USERS:
+        st.title("⏱ Performance")
+        st.write("Timed spans per page and stage, recorded on every rerun and background job.")
+
+        windows = {"Last 5 minutes": 300, "Last hour": 3600, "Last 24 hours": 86400, "Everything recorded": None}
+        window = windows[st.selectbox("Window", list(windows))]
+        st.dataframe(percentiles(window))
+
+        st.subheader("Database connection pool")
+        st.json(get_pool().snapshot())
+
+        st.download_button("Export spans as JSON lines", data=to_jsonl(window), file_name="spans.jsonl",
+                           mime="application/x-ndjson")
+        if METRICS_PORT:
+            st.caption(f"Prometheus metrics: http://127.0.0.1:{METRICS_PORT}/metrics")
+
+    end_rerun()
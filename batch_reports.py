@@ -0,0 +1,108 @@
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from analytics import REPORT_TYPES, report_filters, report_summary, report_table, report_combinations
+from loader import prepare_inventory_frame
+from rollup import build_cube, build_cube_from_db
+from pdf_report import render_pdf_report
+
+# Report combinations handed to a worker process at a time
+TASK_CHUNK_SIZE = 32
+
+# Cube shared by every task of a worker process (sent once per worker, not once per report)
+_worker_cube = None
+
+
+# Function to load the dataset once and roll it up: from inventory_data, or from an .xlsx/.parquet/.csv file
+def load_cube(path=None):
+    if path is None:
+        return build_cube_from_db()
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        from excel_upload import read_inventory_workbook
+        with open(path, 'rb') as file:
+            df, problems = read_inventory_workbook(file)
+        for problem in problems:
+            print(f"warning: {problem}", file=sys.stderr)
+    elif extension == '.parquet':
+        df = pd.read_parquet(path)
+    elif extension == '.csv':
+        df = pd.read_csv(path)
+    else:
+        raise ValueError(f"Unsupported dataset file: {path}")
+    df, _ = prepare_inventory_frame(df)
+    return build_cube(df)
+
+# Function to build a file name for one report combination
+def report_file_name(report_type, month, season, location):
+    parts = [report_type, month, season, location]
+    return "_".join(re.sub(r'[^A-Za-z0-9-]+', '-', str(part)).strip('-') for part in parts)
+
+# Function to set up a worker process with the shared cube
+def _init_worker(cube):
+    global _worker_cube
+    _worker_cube = cube
+
+# Function run in a worker: write one report combination; returns the number of files written
+def _write_report(task):
+    report_type, month, season, location, output_dir, formats = task
+    filters = report_filters(month, season, location)
+    if _worker_cube.filter(filters).empty:
+        return 0
+
+    summary = report_table(report_summary(_worker_cube, report_type, filters))
+    base = os.path.join(output_dir, report_file_name(report_type, month, season, location))
+    written = 0
+    if 'csv' in formats:
+        summary.to_csv(base + '.csv', index=False)
+        written += 1
+    if 'pdf' in formats:
+        title = f"{report_type} Sales Report ({month} / {season} / {location})"
+        with open(base + '.pdf', 'wb') as file:
+            file.write(render_pdf_report(title, summary))
+        written += 1
+    return written
+
+# Function to write every report combination, fanned out over a process pool; returns (reports, files)
+def generate_reports(cube, output_dir, formats=('csv', 'pdf'), report_types=REPORT_TYPES, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [combination + (output_dir, tuple(formats)) for combination in report_combinations(cube, report_types)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cube,)) as executor:
+        written = list(executor.map(_write_report, tasks, chunksize=TASK_CHUNK_SIZE))
+    return sum(1 for count in written if count), sum(written)
+
+
+# Function to run the batch report command line
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the full report pack without the UI")
+    parser.add_argument("output_dir", help="directory the reports are written to")
+    parser.add_argument("--file", help="read the dataset from an .xlsx, .parquet or .csv file instead of the database")
+    parser.add_argument("--formats", default="csv,pdf", help="comma-separated formats: csv, pdf")
+    parser.add_argument("--report-types", default=",".join(REPORT_TYPES),
+                        help="comma-separated report types (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()]
+    report_types = [name.strip() for name in args.report_types.split(",") if name.strip()]
+    unknown = [name for name in report_types if name not in REPORT_TYPES] + \
+              [fmt for fmt in formats if fmt not in ('csv', 'pdf')]
+    if unknown:
+        parser.error(f"unknown report types or formats: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    cube = load_cube(args.file)
+    print(f"Loaded dataset ({len(cube.table):,} cube cells) in {time.perf_counter() - start:.1f}s")
+
+    reports, files = generate_reports(cube, args.output_dir, formats, report_types, args.workers)
+    print(f"Wrote {files:,} files for {reports:,} reports to {args.output_dir} "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+import pandas as pd
+import mysql.connector
+from synthetic_data import iter_inventory, parse_rows
+from loader import prepare_inventory_frame
+from rollup import build_cube, build_cube_from_db
+from analytics import REPORT_TYPES, dashboard_summaries, sales_trend_summaries, report_filters, report_summary, \
+    report_table
+from alerts import build_engine
+from thresholds import empty_thresholds
+from inventory_index import InventoryIndex
+from forecast import build_forecast
+from pdf_report import render_pdf_report
+from database import DB_CONFIG, INSERT_CHUNK_SIZE, WATERMARK_COLUMN, rekey_rows, chunk_to_rows, use_database, set_pool, \
+    insert_data_from_csv, fetch_columns, fetch_watermark, get_connection, table_column
+from schema import migrate
+
+# Baseline the results are compared against (written with --save-baseline)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+
+# A benchmark regresses when it is this much slower / uses this much more memory than the baseline
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.25
+
+# Differences smaller than these are treated as noise
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 5
+
+DEFAULT_SIZES = "10k"
+
+
+# Function to time a call (best of repeat runs) and measure its peak traced allocation in a separate run
+# The traced run is kept apart because tracemalloc slows allocation-heavy code down
+def measure(func, repeat=1):
+    seconds = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    del result
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(seconds, 4), 'peak_mb': round(peak / 1e6, 1)}
+
+# Function to turn the generator's categoricals back into plain strings, as rows arrive from Excel or MySQL
+def as_loaded(df):
+    return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+# Function to render every report type (all filters, plus one location) as CSV and PDF
+def build_reports(cube):
+    location = cube.dimension_values('Location')[0]
+    for filters in (report_filters(), report_filters(location=location)):
+        for report_type in REPORT_TYPES:
+            summary = report_table(report_summary(cube, report_type, filters))
+            summary.to_csv(index=False)
+            render_pdf_report(f"{report_type} Sales Report", summary)
+
+# Function to run the Inventory Monitoring path: index build, filter, one sorted page, reorder alerts
+def inventory_monitoring(df):
+    index = InventoryIndex(df)
+    positions = index.select({'Location': index.values('Location')[:3]})
+    index.page(positions, 0, 100, sort_by='Stock levels', ascending=False)
+    index.page(index.below_reorder(positions), 0, 100, sort_by='Product Sold', ascending=True)
+    return index
+
+# Function to run the client side of insert_data_from_csv: re-keying and turning each chunk into INSERT tuples
+def encode_insert_rows(raw):
+    df, _ = rekey_rows(raw, None)
+    for offset in range(0, len(df), INSERT_CHUNK_SIZE):
+        chunk_to_rows(df.iloc[offset:offset + INSERT_CHUNK_SIZE])
+
+# Function to time the client side of a fetch: building the DataFrame from the row tuples the driver returns
+def measure_fetch_decode(raw, repeat):
+    rows = chunk_to_rows(raw)
+    columns = list(raw.columns)
+    return measure(lambda: pd.DataFrame(rows, columns=columns), repeat)
+
+# Function to run the in-memory hot paths on one dataset
+# insert/fetch are timed without a server here (the Python work on either side of the wire); --db times them
+# end to end against MySQL
+def run_memory_benchmarks(raw, repeat):
+    results = {}
+    results['insert_encode'] = measure(lambda: encode_insert_rows(raw), repeat)
+    results['fetch_decode'] = measure_fetch_decode(raw, repeat)
+    results['prepare_frame'] = measure(lambda: prepare_inventory_frame(raw.copy()), repeat)
+    df, _ = prepare_inventory_frame(raw.copy())
+    results['build_cube'] = measure(lambda: build_cube(df), repeat)
+    cube = build_cube(df)
+    results['dashboard'] = measure(lambda: (dashboard_summaries(cube), sales_trend_summaries(cube)), repeat)
+    results['alerts'] = measure(lambda: build_engine(df, empty_thresholds()), repeat)
+    results['inventory_monitoring'] = measure(lambda: inventory_monitoring(df), repeat)
+    results['reports'] = measure(lambda: build_reports(cube), repeat)
+    results['forecast'] = measure(lambda: build_forecast(cube), repeat)
+    return results
+
+# Function to run the benchmarks inside a new, migrated schema on the configured server, dropped afterwards
+# CREATE DATABASE fails if the schema already exists, so an existing database is never written to or dropped
+@contextmanager
+def scratch_database(name):
+    if name == DB_CONFIG['database']:
+        raise ValueError(f"The scratch schema must not be the app's database ({name}).")
+
+    server = {key: value for key, value in DB_CONFIG.items() if key != 'database'}
+    conn = mysql.connector.connect(**server)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE `{name}`")
+        previous = use_database(name)
+        try:
+            migrate()
+            yield
+        finally:
+            set_pool(previous).close()
+            cursor.execute(f"DROP DATABASE `{name}`")
+    finally:
+        cursor.close()
+        conn.close()
+
+# Function to run the database hot paths (bulk insert, column fetch and the GROUP BY cube) in the scratch schema
+# The inserted id range is deleted afterwards, so each dataset size starts from an empty table
+def run_database_benchmarks(raw):
+    first_id = (fetch_watermark() or 0) + 1
+    raw = raw.assign(**{WATERMARK_COLUMN: raw[WATERMARK_COLUMN] - raw[WATERMARK_COLUMN].min() + first_id})
+    last_id = int(raw[WATERMARK_COLUMN].max())
+
+    results = {}
+    try:
+        start = time.perf_counter()
+        insert_data_from_csv(raw, show_summary=False)
+        results['db_insert'] = {'seconds': round(time.perf_counter() - start, 4), 'peak_mb': None}
+        results['db_fetch'] = measure(lambda: fetch_columns(after=first_id - 1, through=last_id))
+        results['db_cube'] = measure(build_cube_from_db)
+    finally:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"DELETE FROM inventory_data WHERE {table_column(WATERMARK_COLUMN)} BETWEEN %s AND %s",
+                               (first_id, last_id))
+                conn.commit()
+            finally:
+                cursor.close()
+    return results
+
+# Function to compare results with a baseline; returns a list of regression messages
+def compare(results, baseline, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, current in benchmarks.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            slower = current['seconds'] - base['seconds']
+            if slower > MIN_SECONDS and current['seconds'] > base['seconds'] * (1 + time_threshold):
+                regressions.append(f"{size} {name}: {current['seconds']:.3f}s vs baseline {base['seconds']:.3f}s")
+            if current.get('peak_mb') is not None and base.get('peak_mb') is not None:
+                grown = current['peak_mb'] - base['peak_mb']
+                if grown > MIN_PEAK_MB and current['peak_mb'] > base['peak_mb'] * (1 + memory_threshold):
+                    regressions.append(f"{size} {name}: peak {current['peak_mb']:.1f} MB "
+                                       f"vs baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+# Function to run the benchmarks for each comma-separated dataset size
+def run_sizes(sizes, repeat, database):
+    results = {}
+    for size in [size.strip() for size in sizes.split(",") if size.strip()]:
+        rows = parse_rows(size)
+        print(f"Generating {rows:,} rows...", flush=True)
+        raw = as_loaded(pd.concat(iter_inventory(rows), ignore_index=True))
+        results[size] = run_memory_benchmarks(raw, repeat)
+        if database:
+            results[size].update(run_database_benchmarks(raw))
+        del raw
+        for name, result in results[size].items():
+            peak = f"{result['peak_mb']:>9.1f} MB" if result['peak_mb'] is not None else " " * 12
+            print(f"  {size:>5} {name:<22} {result['seconds']:>9.3f}s {peak}")
+    return results
+
+
+# Function to run the benchmark command line
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths on synthetic datasets")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated dataset sizes, e.g. 10k,1M,10M")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per benchmark (best is kept)")
+    parser.add_argument("--db", metavar="SCRATCH_SCHEMA",
+                        help="also benchmark insert/fetch/cube against the INVENTORY_DB_* server, in this new schema "
+                             "(created and migrated for the run, then dropped; it must not exist yet)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with scratch_database(args.db) if args.db else nullcontext():
+        results = run_sizes(args.sizes, args.repeat, args.db is not None)
+
+    report = {'python': platform.python_version(), 'pandas': pd.__version__, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline).")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+
+
+# Process-wide LRU cache that builds each missing entry once, even under concurrent sessions
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    # Function to return the cached value for a key, building it with builder() on a miss
+    def get_or_build(self, key, builder):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._entries:
+                    return self._entries[key]
+            value = builder()
+            with self._lock:
+                self._entries[key] = value
+                self._build_locks.pop(key, None)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    # Function to return the cached value for a key without building it (None on a miss)
+    def peek(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    # Function to store a value under a key (e.g. a derived entry carried over to a new version)
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    # Function to drop cached entries: one key, every key matching a predicate, or everything
+    def invalidate(self, key=None, predicate=None):
+        with self._lock:
+            if key is None and predicate is None:
+                self._entries.clear()
+            elif key is not None:
+                self._entries.pop(key, None)
+            else:
+                for stale in [k for k in self._entries if predicate(k)]:
+                    del self._entries[stale]
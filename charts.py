@@ -0,0 +1,56 @@
+import io
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from cache import LRUCache
+from perf import span
+
+# Figure size (inches) and resolution for report charts
+FIGURE_SIZE = (10, 5)
+FIGURE_DPI = 100
+
+# Number of rendered charts kept in memory
+MAX_CACHED_CHARTS = 256
+
+_chart_cache = LRUCache(MAX_CACHED_CHARTS)
+
+
+# Function to render a bar chart to PNG/SVG bytes with the object-oriented Figure API
+# The figure is never registered with pyplot, so nothing global is shared or leaked between sessions
+def render_bar_chart(x, y, title, xlabel, ylabel, color, fmt='png'):
+    with span('chart.render', rows=len(x)) as sizes:
+        image = _draw_bar_chart(x, y, title, xlabel, ylabel, color, fmt)
+        sizes['bytes'] = len(image)
+    return image
+
+# Function to draw the bar chart and encode it
+def _draw_bar_chart(x, y, title, xlabel, ylabel, color, fmt):
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.bar([str(value) for value in x], y, color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if len(x) > 12:
+        ax.tick_params(axis='x', labelrotation=90)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    fig.clear()
+    return buffer.getvalue()
+
+# Function to get a chart's bytes, rendering only on a cache miss
+# key should identify the dataset version and report parameters the chart was drawn from
+def cached_bar_chart(key, x, y, title, xlabel, ylabel, color, fmt='png'):
+    return _chart_cache.get_or_build(
+        (key, fmt),
+        lambda: render_bar_chart(list(x), list(y), title, xlabel, ylabel, color, fmt)
+    )
+
+# Function to drop cached charts for a dataset version (or all of them)
+def invalidate_charts(version=None):
+    if version is None:
+        _chart_cache.invalidate()
+    else:
+        _chart_cache.invalidate(predicate=lambda key: key[0][0] == version)
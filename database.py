@@ -1,46 +1,693 @@
+import hashlib
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 import pandas as pd
 import mysql.connector
 import streamlit as st
+from perf import span
 
-# Function to insert CSV data into the MySQL table
-def insert_data_from_csv(df):
-    # Connect to MySQL
-    conn = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="root",  
-        database="inventory_db"
-    )
-    cursor = conn.cursor()
+# Database connection settings (override through environment variables)
+DB_CONFIG = {
+    "host": os.environ.get("INVENTORY_DB_HOST", "localhost"),
+    "user": os.environ.get("INVENTORY_DB_USER", "root"),
+    "password": os.environ.get("INVENTORY_DB_PASSWORD", "root"),
+    "database": os.environ.get("INVENTORY_DB_NAME", "inventory_db"),
+}
+
+# Connection pool tuning
+POOL_SIZE = int(os.environ.get("INVENTORY_DB_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.environ.get("INVENTORY_DB_POOL_TIMEOUT", "10"))
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+# Process-wide pool of MySQL connections shared by every Streamlit session
+class ConnectionPool:
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, **config):
+        self.size = size
+        self.timeout = timeout
+        self.config = config or DB_CONFIG
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "reconnects": 0, "wait_seconds": 0.0}
+
+    # Function to take a healthy connection from the pool, opening one if below the size limit
+    def checkout(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    can_create = True
+                else:
+                    can_create = False
+            if can_create:
+                try:
+                    conn = mysql.connector.connect(**self.config)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                start = time.perf_counter()
+                with self._lock:
+                    self.stats["waits"] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.stats["timeouts"] += 1
+                    raise PoolTimeoutError(f"No database connection available within {self.timeout}s.")
+                finally:
+                    with self._lock:
+                        self.stats["wait_seconds"] += time.perf_counter() - start
+
+        # Health check: reconnect connections the server has dropped
+        if not conn.is_connected():
+            try:
+                conn.reconnect(attempts=2, delay=0)
+            except Exception:
+                self._discard(conn)
+                raise
+            with self._lock:
+                self.stats["reconnects"] += 1
+
+        with self._lock:
+            self.stats["checkouts"] += 1
+        return conn
+
+    # Function to hand a connection back, dropping any uncommitted work
+    def checkin(self, conn):
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    # Function to drop a broken connection, closing its socket and freeing its slot
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        with span('db.checkout'):
+            conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    # Function to report pool usage counters
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, size=self.size, open=self._created, idle=self._idle.qsize())
+
+    # Function to close the pool's idle connections once it is no longer used
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Version of inventory_data as seen by this process, bumped on every write through this module
+_inventory_version = 0
+_inventory_version_lock = threading.Lock()
+
+# Function to get the shared connection pool
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+# Function to point the shared pool at another database on the same server (e.g. a scratch schema)
+# Returns the previous pool so the caller can switch back with set_pool
+def use_database(name):
+    return set_pool(ConnectionPool(**dict(DB_CONFIG, database=name)))
+
+# Function to replace the shared connection pool; returns the previous one
+def set_pool(pool):
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    return previous
 
-    # Function to insert data into the table
-    def insert_data(row):
-        sql = """INSERT INTO inventory_data (
-            Transaction_ID, Date_Sold, Product_ID, customer_id, Gender, Age, Product_Sold, quantity_sold, price_per_product,
-            Unit_Cost, Total_Cost, Total_Revenue, Profit, Availability, Stock_levels, Reorder_Levels, Order_quantities, 
-            Location, Restock_Date, Restock_Quantity, invoice_no, payment_method, invoice_date, Purchase_Frequency_Monthly, 
-            Season, Month, Restock_Needed, previous_sales, sales_moving_avg, Days_Since_Last_Restock, Sales_Growth_Rate, 
-            Lead_Time, Promotion_Flag, Customer_Segment, Holiday_Season_Flag, Predicted_Sales, Current_Stock, 
-            Trained_M_Restock_Quantity
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
-        
-        data = (
-            row['Transaction ID'], row['Date Sold'], row['Product ID'], row['customer_id'], row['Gender'], row['Age'], 
-            row['Product Sold'], row['quantity sold'], row['price per product'], row['Unit Cost'], row['Total_Cost'], 
-            row['Total Revenue'], row['Profit'], row['Availability'], row['Stock levels'], row['Reorder Levels'], 
-            row['Order quantities'], row['Location'], row['Restock Date'], row['Restock Quantity'], row['invoice_no'], 
-            row['payment_method'], row['invoice_date'], row['Purchase Frequency(Monthly)'], row['Season'], row['Month'], 
-            row['Restock Needed'], row['previous_sales'], row['sales_moving_avg'], row['Days Since Last Restock'], 
-            row['Sales Growth Rate'], row['Lead Time'], row['Promotion Flag'], row['Customer Segment'], 
-            row['Holiday Season Flag'], row['Predicted Sales'], row['Current Stock'], row['Trained M.Restock Quantity']
+# Function to borrow a pooled connection: `with get_connection() as conn:`
+def get_connection():
+    return get_pool().connection()
+
+# Callbacks run with each DataFrame written to inventory_data (e.g. to update alerts incrementally)
+_ingest_listeners = []
+
+# Function to register a callback for newly ingested rows
+def register_ingest_listener(listener):
+    if listener not in _ingest_listeners:
+        _ingest_listeners.append(listener)
+
+# Function to pass newly ingested rows to every registered listener
+def notify_ingest(df):
+    for listener in list(_ingest_listeners):
+        listener(df)
+
+# Function to get the current inventory_data version token
+def inventory_version():
+    return f"db:{_inventory_version}"
+
+# Function to mark inventory_data as changed so cached aggregates are rebuilt
+def bump_inventory_version():
+    global _inventory_version
+    with _inventory_version_lock:
+        _inventory_version += 1
+    return inventory_version()
+
+# Mapping of the spreadsheet/DataFrame columns to the inventory_data table columns
+COLUMN_MAP = [
+    ('Transaction ID', 'Transaction_ID'),
+    ('Date Sold', 'Date_Sold'),
+    ('Product ID', 'Product_ID'),
+    ('customer_id', 'customer_id'),
+    ('Gender', 'Gender'),
+    ('Age', 'Age'),
+    ('Product Sold', 'Product_Sold'),
+    ('quantity sold', 'quantity_sold'),
+    ('price per product', 'price_per_product'),
+    ('Unit Cost', 'Unit_Cost'),
+    ('Total_Cost', 'Total_Cost'),
+    ('Total Revenue', 'Total_Revenue'),
+    ('Profit', 'Profit'),
+    ('Availability', 'Availability'),
+    ('Stock levels', 'Stock_levels'),
+    ('Reorder Levels', 'Reorder_Levels'),
+    ('Order quantities', 'Order_quantities'),
+    ('Location', 'Location'),
+    ('Restock Date', 'Restock_Date'),
+    ('Restock Quantity', 'Restock_Quantity'),
+    ('invoice_no', 'invoice_no'),
+    ('payment_method', 'payment_method'),
+    ('invoice_date', 'invoice_date'),
+    ('Purchase Frequency(Monthly)', 'Purchase_Frequency_Monthly'),
+    ('Season', 'Season'),
+    ('Month', 'Month'),
+    ('Restock Needed', 'Restock_Needed'),
+    ('previous_sales', 'previous_sales'),
+    ('sales_moving_avg', 'sales_moving_avg'),
+    ('Days Since Last Restock', 'Days_Since_Last_Restock'),
+    ('Sales Growth Rate', 'Sales_Growth_Rate'),
+    ('Lead Time', 'Lead_Time'),
+    ('Promotion Flag', 'Promotion_Flag'),
+    ('Customer Segment', 'Customer_Segment'),
+    ('Holiday Season Flag', 'Holiday_Season_Flag'),
+    ('Predicted Sales', 'Predicted_Sales'),
+    ('Current Stock', 'Current_Stock'),
+    ('Trained M.Restock Quantity', 'Trained_M_Restock_Quantity'),
+]
+
+DATAFRAME_COLUMNS = [frame_col for frame_col, _ in COLUMN_MAP]
+TABLE_COLUMNS = [table_col for _, table_col in COLUMN_MAP]
+
+# Ingestion tuning (rows per executemany batch and rows per transaction)
+INSERT_CHUNK_SIZE = 5000
+INSERT_COMMIT_SIZE = 50000
+
+INSERT_SQL = "INSERT INTO inventory_data ({}) VALUES ({})".format(
+    ", ".join(TABLE_COLUMNS), ", ".join(["%s"] * len(TABLE_COLUMNS))
+)
+
+# Function to check that a DataFrame carries every column the INSERT maps
+def validate_columns(df):
+    missing = [col for col in DATAFRAME_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Dataset is missing required columns: {', '.join(missing)}")
+    if len(TABLE_COLUMNS) != INSERT_SQL.count("%s"):
+        raise ValueError("Column mapping does not match the number of INSERT placeholders.")
+
+# Function to give every row a Transaction ID above the table's watermark, so incremental refreshes see it
+# Rows with no id, an id at or below the watermark, or an id already used earlier in the file get new ids
+# after the largest one; returns (DataFrame, number of rows given a new id)
+def rekey_rows(df, watermark):
+    ids = pd.to_numeric(df[WATERMARK_COLUMN], errors='coerce')
+    stale = ids.isna() | ids.duplicated()
+    if watermark is not None:
+        stale |= ids <= watermark
+    count = int(stale.sum())
+    if not count:
+        return df, 0
+    kept = ids[~stale]
+    first = int(max(watermark or 0, kept.max() if len(kept) else 0)) + 1
+    ids = ids.copy()
+    ids[stale] = range(first, first + count)
+    return df.assign(**{WATERMARK_COLUMN: ids.astype('int64')}), count
+
+# Function to turn a chunk of the DataFrame into MySQL-ready tuples (NaN/NaT -> NULL)
+def chunk_to_rows(chunk):
+    chunk = chunk[DATAFRAME_COLUMNS].astype(object)
+    chunk = chunk.where(chunk.notna(), None)
+    return list(chunk.itertuples(index=False, name=None))
+
+# Function to load one chunk through LOAD DATA LOCAL INFILE via a temporary CSV file
+def load_chunk_from_file(cursor, chunk):
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="") as tmp:
+        chunk[DATAFRAME_COLUMNS].to_csv(tmp, index=False, header=False, na_rep="\\N",
+                                        date_format="%Y-%m-%d %H:%M:%S")
+        tmp_path = tmp.name
+    try:
+        cursor.execute(
+            "LOAD DATA LOCAL INFILE %s INTO TABLE inventory_data "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' ({})".format(", ".join(TABLE_COLUMNS)),
+            (tmp_path,)
         )
-        cursor.execute(sql, data)
+    finally:
+        os.remove(tmp_path)
+
+# Function to insert CSV data into the MySQL table in chunked batches
+# show_summary=False leaves the completion message to the caller (e.g. a background job)
+def insert_data_from_csv(df, chunk_size=INSERT_CHUNK_SIZE, commit_size=INSERT_COMMIT_SIZE,
+                         use_load_data=False, progress_callback=None, show_summary=True):
+    # Check the column mapping once before touching the database
+    validate_columns(df)
+    df, rekeyed = rekey_rows(df, fetch_watermark())
+
+    # LOAD DATA LOCAL INFILE needs a connection that allows it, so that path opens its own connection
+    # instead of enabling local infile on every pooled one
+    pool = get_pool()
+    if use_load_data:
+        conn = mysql.connector.connect(**pool.config, allow_local_infile=True)
+    else:
+        conn = pool.checkout()
+    cursor = conn.cursor()
+
+    total_rows = len(df)
+    inserted = 0
+    since_commit = 0
+    start = time.perf_counter()
+
+    try:
+        for offset in range(0, total_rows, chunk_size):
+            chunk = df.iloc[offset:offset + chunk_size]
+            with span('db.insert', rows=len(chunk)):
+                if use_load_data:
+                    load_chunk_from_file(cursor, chunk)
+                else:
+                    # executemany rewrites the INSERT into multi-row VALUES batches
+                    cursor.executemany(INSERT_SQL, chunk_to_rows(chunk))
+
+            inserted += len(chunk)
+            since_commit += len(chunk)
+            if since_commit >= commit_size:
+                conn.commit()
+                since_commit = 0
+
+            if progress_callback is not None:
+                elapsed = time.perf_counter() - start
+                progress_callback(inserted, total_rows, inserted / elapsed if elapsed > 0 else 0.0)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if use_load_data:
+            conn.close()
+        else:
+            pool.checkin(conn)
 
-    # Insert each row from the CSV into the MySQL table
-    for index, row in df.iterrows():
-        insert_data(row)
+    # Shared aggregates pick the rows up through the Transaction_ID watermark (sync.refresh_shared)
+    if not show_summary:
+        return inserted
+    elapsed = time.perf_counter() - start
+    rows_per_second = inserted / elapsed if elapsed > 0 else 0.0
+    st.success(f"CSV data has been successfully added to the database "
+               f"({inserted} rows in {elapsed:.1f}s, {rows_per_second:,.0f} rows/s).")
+    if rekeyed:
+        st.info(f"{rekeyed} rows had a missing or already used Transaction ID and were given new ones.")
+    return inserted
 
-    conn.commit()
-    cursor.close()
-    conn.close()
-    st.success("CSV data has been successfully added to the database.")
+FRAME_TO_TABLE = dict(COLUMN_MAP)
+
+# Column used as the high-water mark for incremental refreshes
+# New rows get ids above it: AUTO_INCREMENT for added products, rekey_rows for imported files
+WATERMARK_COLUMN = 'Transaction ID'
+
+# Function to map a DataFrame column name to its quoted table column
+def table_column(column):
+    if column not in FRAME_TO_TABLE:
+        raise ValueError(f"Unknown inventory column: {column}")
+    return f"`{FRAME_TO_TABLE[column]}`"
+
+# Function to build a WHERE clause from {column: value} filters plus an optional fixed condition
+def build_where(filters=None, condition=None):
+    clauses = []
+    params = []
+    for column, value in (filters or {}).items():
+        if value is None or value == 'All':
+            continue
+        # A year is sent as a Date_Sold range, which MySQL can prune partitions with
+        if column == 'Year':
+            clauses.append(f"{table_column('Date Sold')} >= %s AND {table_column('Date Sold')} < %s")
+            params.extend([f"{int(value)}-01-01", f"{int(value) + 1}-01-01"])
+            continue
+        if isinstance(value, (list, tuple, set)):
+            clauses.append(f"{table_column(column)} IN ({', '.join(['%s'] * len(value))})")
+            params.extend(value)
+        else:
+            clauses.append(f"{table_column(column)} = %s")
+            params.append(value)
+    if condition:
+        clauses.append(condition)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+# Function to run a query on a pooled connection and return a DataFrame
+def read_query(sql, params=None):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            with span('db.query') as sizes:
+                cursor.execute(sql, params or ())
+                rows = cursor.fetchall()
+                sizes['rows'] = len(rows)
+            columns = [desc[0] for desc in cursor.description]
+        finally:
+            cursor.close()
+    with span('db.to_frame', rows=len(rows)) as sizes:
+        df = pd.DataFrame(rows, columns=columns)
+        sizes['bytes'] = int(df.memory_usage(index=False).sum())
+    return df
+
+# Function to build the query for the requested columns of inventory_data
+# after/through bound the rows by the watermark column (after < id <= through)
+def columns_query(columns=None, filters=None, condition=None, after=None, through=None):
+    columns = columns or DATAFRAME_COLUMNS
+    select_list = ", ".join(f"{table_column(col)} AS `{col}`" for col in columns)
+    where, params = build_where(filters, condition)
+    for operator, bound in (('>', after), ('<=', through)):
+        if bound is not None:
+            where += (" AND " if where else " WHERE ") + f"{table_column(WATERMARK_COLUMN)} {operator} %s"
+            params.append(bound)
+    return f"SELECT {select_list} FROM inventory_data{where}", params
+
+# Function to fetch only the requested columns of inventory_data (see columns_query)
+def fetch_columns(columns=None, filters=None, condition=None, after=None, through=None):
+    return read_query(*columns_query(columns, filters, condition, after, through))
+
+# Function to stream the requested columns of inventory_data as DataFrames of up to chunk_rows rows
+# The cursor is unbuffered, so only one chunk is held in memory at a time
+def iter_columns(columns=None, filters=None, condition=None, chunk_rows=100000):
+    columns = columns or DATAFRAME_COLUMNS
+    sql, params = columns_query(columns, filters, condition)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            while True:
+                with span('db.fetch_chunk') as sizes:
+                    rows = cursor.fetchmany(chunk_rows)
+                    sizes['rows'] = len(rows)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=columns)
+        finally:
+            # An export stopped part way leaves rows unread, which must be drained before the connection is reused
+            conn.consume_results()
+            cursor.close()
+
+# Function to build the query for the latest row per key, ranked in MySQL so only one row per key is sent
+# Rows without a 'Date Sold' count as the most recent, then the latest date, then the highest watermark id
+def latest_rows_query(columns, key_columns, through=None):
+    select_list = ", ".join(f"{table_column(col)} AS `{col}`" for col in columns)
+    partition_list = ", ".join(table_column(col) for col in key_columns)
+    date_sold = table_column('Date Sold')
+    where, params = "", []
+    if through is not None:
+        where, params = f" WHERE {table_column(WATERMARK_COLUMN)} <= %s", [through]
+    sql = (f"SELECT {', '.join(f'`{col}`' for col in columns)} FROM ("
+           f"SELECT {select_list}, ROW_NUMBER() OVER (PARTITION BY {partition_list} ORDER BY {date_sold} IS NULL DESC, "
+           f"{date_sold} DESC, {table_column(WATERMARK_COLUMN)} DESC) AS row_rank FROM inventory_data{where}"
+           f") ranked WHERE row_rank = 1")
+    return sql, params
+
+# Function to fetch the latest row per key of inventory_data (see latest_rows_query)
+def fetch_latest_rows(columns, key_columns, through=None):
+    sql, params = latest_rows_query(columns, key_columns, through)
+    return read_query(sql, params)
+
+WATERMARK_SQL = f"SELECT MAX({table_column(WATERMARK_COLUMN)}) AS mark FROM inventory_data"
+
+# Function to read the current high-water mark of inventory_data (None when the table is empty)
+def fetch_watermark():
+    return read_query(WATERMARK_SQL)['mark'].iloc[0]
+
+# Storage format tag for per-user datasets (legacy rows have no tag and hold JSON)
+DATASET_FORMAT = "parquet-zstd-v1"
+
+# Function to compute a content hash of a DataFrame (values, index and column names)
+def dataset_hash(df):
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+# Function to serialize a DataFrame to compressed Parquet bytes
+def serialize_dataset(df):
+    with span('dataset.to_parquet', rows=len(df)) as sizes:
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, compression="zstd", index=False)
+        sizes['bytes'] = buffer.tell()
+    return buffer.getvalue()
+
+# Segments appended to a user's dataset before it is compacted into the base blob
+COMPACT_AFTER_SEGMENTS = 20
+
+# Function to save a user's dataset as the new base blob, dropping appended segments it already includes
+# Returns False when an identical dataset with no pending segments is already stored
+# through_segment limits the dropped segments (compaction); None drops them all (fresh upload)
+def save_user_dataset(username, df, through_segment=None):
+    content_hash = dataset_hash(df)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT content_hash FROM datasets WHERE username = %s", (username,))
+            row = cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) FROM dataset_segments WHERE username = %s", (username,))
+            pending_segments = cursor.fetchone()[0]
+            if row and row[0] == content_hash and not pending_segments:
+                return False
+
+            payload = serialize_dataset(df)
+            cursor.execute(
+                "INSERT INTO datasets (username, data, data_format, content_hash, size_bytes) "
+                "VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE data = VALUES(data), "
+                "data_format = VALUES(data_format), content_hash = VALUES(content_hash), "
+                "size_bytes = VALUES(size_bytes)",
+                (username, payload, DATASET_FORMAT, content_hash, len(payload))
+            )
+            if through_segment is None:
+                cursor.execute("DELETE FROM dataset_segments WHERE username = %s", (username,))
+            else:
+                cursor.execute("DELETE FROM dataset_segments WHERE username = %s AND segment_id <= %s",
+                               (username, through_segment))
+            conn.commit()
+        finally:
+            cursor.close()
+    return True
+
+# Function to append new rows to a user's dataset as a small segment; returns the pending segment count
+def append_user_dataset_segment(username, df):
+    payload = serialize_dataset(df)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO dataset_segments (username, data_format, data, row_count) VALUES (%s, %s, %s, %s)",
+                (username, DATASET_FORMAT, payload, len(df))
+            )
+            cursor.execute("SELECT COUNT(*) FROM dataset_segments WHERE username = %s", (username,))
+            pending_segments = cursor.fetchone()[0]
+            conn.commit()
+        finally:
+            cursor.close()
+    return pending_segments
+
+ACCOUNT_SQL = (
+    "SELECT u.password_hash, d.username IS NOT NULL AS has_dataset, d.data_format, d.content_hash, "
+    "d.size_bytes, (SELECT MAX(s.segment_id) FROM dataset_segments s WHERE s.username = u.username) "
+    "AS last_segment FROM users u LEFT JOIN datasets d ON d.username = u.username WHERE u.username = %s"
+)
+
+# Function to fetch a user's password hash and saved-dataset metadata in one query (None if no such user)
+# Only narrow columns are read; the dataset blob itself stays in the table until a page needs it
+def fetch_account(username):
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(ACCOUNT_SQL, (username,))
+            account = cursor.fetchone()
+        finally:
+            cursor.close()
+
+    if account is None:
+        return None
+    dataset = None
+    if account['has_dataset']:
+        dataset = {
+            'format': account['data_format'],
+            'size_bytes': account['size_bytes'],
+            'content_hash': account['content_hash'],
+            'version': f"{account['content_hash']}:{account['last_segment']}",
+        }
+    return {'password_hash': account['password_hash'], 'dataset': dataset}
+
+# Function to decode one stored dataset blob
+def decode_dataset(data_format, payload, columns=None):
+    if data_format == DATASET_FORMAT:
+        with span('dataset.read_parquet', nbytes=len(payload)) as sizes:
+            df = pd.read_parquet(io.BytesIO(payload), columns=columns)
+            sizes['rows'] = len(df)
+        return df
+
+    # Legacy JSON rows written before the Parquet format
+    with span('dataset.read_json', nbytes=len(payload)) as sizes:
+        if isinstance(payload, (bytes, bytearray)):
+            payload = payload.decode("utf-8")
+        df = pd.read_json(io.StringIO(payload))
+        sizes['rows'] = len(df)
+    return df[columns] if columns is not None else df
+
+# Function to load a user's dataset, reading only the requested columns; None if nothing stored
+# Returns the frame and the id of the last segment folded into it
+def load_user_dataset_with_segments(username, columns=None):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT data_format, data FROM datasets WHERE username = %s", (username,))
+            row = cursor.fetchone()
+            cursor.execute(
+                "SELECT segment_id, data_format, data FROM dataset_segments WHERE username = %s ORDER BY segment_id",
+                (username,)
+            )
+            segments = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    if not row:
+        return None, None
+    frames = [decode_dataset(row[0], row[1], columns)]
+    frames += [decode_dataset(data_format, payload) for _, data_format, payload in segments]
+    if len(frames) == 1:
+        return frames[0], None
+
+    # Segments may lack columns the base has (e.g. product additions); align them to the base
+    base_columns = list(frames[0].columns)
+    frames = [frames[0]] + [frame.reindex(columns=base_columns) for frame in frames[1:]]
+    return pd.concat(frames, ignore_index=True), segments[-1][0]
+
+# Function to load a user's dataset, reading only the requested columns; None if nothing stored
+def load_user_dataset(username, columns=None):
+    return load_user_dataset_with_segments(username, columns)[0]
+
+# Function to fold a user's appended segments back into the base blob
+def compact_user_dataset(username):
+    df, last_segment = load_user_dataset_with_segments(username)
+    if df is None or last_segment is None:
+        return False
+    return save_user_dataset(username, df, through_segment=last_segment)
+
+# Function to append rows to inventory_data without touching existing rows; returns the number of rows
+# Readers pick the rows up through the Transaction_ID watermark (see sync.refresh_shared)
+def append_inventory_rows(df):
+    rows = chunk_to_rows(df.reindex(columns=DATAFRAME_COLUMNS))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for offset in range(0, len(rows), INSERT_CHUNK_SIZE):
+                cursor.executemany(INSERT_SQL, rows[offset:offset + INSERT_CHUNK_SIZE])
+            conn.commit()
+        finally:
+            cursor.close()
+    return len(rows)
+
+# Location value for a threshold that applies to every location of a product
+ALL_LOCATIONS = '*'
+
+# Seconds a reorder_thresholds version read from the table is reused before the table is checked again
+THRESHOLDS_VERSION_TTL = 5.0
+
+# Last version token read from reorder_thresholds and when it was read
+_thresholds_version = None
+_thresholds_checked = 0.0
+_thresholds_lock = threading.Lock()
+
+THRESHOLD_UPSERT_SQL = (
+    "INSERT INTO reorder_thresholds (Product_Sold, Location, Reorder_Level) VALUES (%s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE Reorder_Level = VALUES(Reorder_Level)"
+)
+
+THRESHOLDS_VERSION_SQL = "SELECT COUNT(*) AS row_count, MAX(updated_at) AS last_update FROM reorder_thresholds"
+
+# Function to get the current reorder_thresholds version token
+# It is derived from the table (row count and last update), so upserts made by any process are picked up
+# within THRESHOLDS_VERSION_TTL seconds; upserts made by this process are picked up immediately
+def thresholds_version():
+    global _thresholds_version, _thresholds_checked
+    with _thresholds_lock:
+        if _thresholds_version is None or time.monotonic() - _thresholds_checked >= THRESHOLDS_VERSION_TTL:
+            row = read_query(THRESHOLDS_VERSION_SQL).iloc[0]
+            _thresholds_version = f"thresholds:{row['row_count']}:{row['last_update']}"
+            _thresholds_checked = time.monotonic()
+        return _thresholds_version
+
+# Function to bulk upsert reorder thresholds
+# thresholds has 'Product Sold', 'Location' (None for every location) and 'Reorder Levels'
+def upsert_thresholds(thresholds, chunk_size=INSERT_CHUNK_SIZE):
+    global _thresholds_version
+    locations = thresholds['Location'].astype(object).where(thresholds['Location'].notna(), ALL_LOCATIONS)
+    rows = list(zip(thresholds['Product Sold'].astype(str), locations.astype(str),
+                    thresholds['Reorder Levels'].astype(float)))
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for offset in range(0, len(rows), chunk_size):
+                cursor.executemany(THRESHOLD_UPSERT_SQL, rows[offset:offset + chunk_size])
+            conn.commit()
+        finally:
+            cursor.close()
+
+    with _thresholds_lock:
+        _thresholds_version = None
+    return len(rows)
+
+# Function to fetch every stored reorder threshold
+def fetch_thresholds():
+    thresholds = read_query(
+        "SELECT Product_Sold AS `Product Sold`, Location, Reorder_Level AS `Reorder Levels` FROM reorder_thresholds"
+    )
+    thresholds['Location'] = thresholds['Location'].where(thresholds['Location'] != ALL_LOCATIONS, None)
+    thresholds['Reorder Levels'] = pd.to_numeric(thresholds['Reorder Levels'])
+    return thresholds
@@ -0,0 +1,127 @@
+import hashlib
+import pandas as pd
+from openpyxl import load_workbook
+from database import DATAFRAME_COLUMNS, save_user_dataset, insert_data_from_csv
+from jobs import submit_job, get_runner, DONE, FAILED, CANCELLED
+from sync import refresh_shared
+
+# Rows parsed and validated per chunk
+UPLOAD_CHUNK_SIZE = 10000
+
+# Rows shown in the upload preview
+PREVIEW_ROWS = 100
+
+# Columns that must parse as numbers / dates in every chunk
+NUMERIC_COLUMNS = ['Age', 'quantity sold', 'price per product', 'Unit Cost', 'Total_Cost', 'Total Revenue',
+                   'Profit', 'Stock levels', 'Reorder Levels', 'Order quantities', 'Restock Quantity']
+DATE_COLUMNS = ['Date Sold', 'Restock Date', 'invoice_date']
+
+
+# Function to hash an uploaded file so reruns with the same file are recognized
+def file_hash(uploaded_file):
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+# Function to check that the header carries every column the inventory table maps
+def validate_header(header):
+    missing = [col for col in DATAFRAME_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Uploaded file is missing required columns: {', '.join(missing)}")
+
+# Function to validate one chunk; returns a list of problems found
+def validate_chunk(chunk, first_row):
+    problems = []
+    for col in NUMERIC_COLUMNS:
+        values = chunk[col]
+        bad = values.notna() & pd.to_numeric(values, errors='coerce').isna()
+        if bad.any():
+            problems.append(f"'{col}' has {int(bad.sum())} non-numeric values near row {first_row}")
+    for col in DATE_COLUMNS:
+        values = chunk[col]
+        bad = values.notna() & pd.to_datetime(values, errors='coerce').isna()
+        if bad.any():
+            problems.append(f"'{col}' has {int(bad.sum())} unparseable dates near row {first_row}")
+    return problems
+
+# Function to stream an Excel workbook chunk by chunk in read-only mode
+def read_excel_chunks(uploaded_file, chunk_size=UPLOAD_CHUNK_SIZE):
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = max((sheet.max_row or 1) - 1, 0)
+        rows = sheet.iter_rows(values_only=True)
+
+        header = [str(value) if value is not None else "" for value in next(rows, ())]
+        validate_header(header)
+        yield header, total_rows
+
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=header), total_rows
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header), total_rows
+    finally:
+        workbook.close()
+
+# Function to read and validate a whole inventory workbook, reporting progress per chunk
+def read_inventory_workbook(uploaded_file, chunk_size=UPLOAD_CHUNK_SIZE, progress_callback=None):
+    chunks = []
+    problems = []
+    rows_read = 0
+
+    stream = read_excel_chunks(uploaded_file, chunk_size)
+    next(stream)  # header row, validated before any data is parsed
+    for chunk, total_rows in stream:
+        problems.extend(validate_chunk(chunk, rows_read + 2))
+        chunks.append(chunk)
+        rows_read += len(chunk)
+        if progress_callback is not None:
+            progress_callback(rows_read, total_rows)
+
+    if not chunks:
+        raise ValueError("Uploaded file has no data rows.")
+    return pd.concat(chunks, ignore_index=True), problems
+
+
+# Function run as a background job: save an upload to the user's account
+def persist_job(job, username, df):
+    job.report(0.0, "Saving dataset")
+    return 'saved' if save_user_dataset(username, df) else 'unchanged'
+
+# Function to save an upload to the user's account as a background job
+# Only a save of the same file that is still queued or running is reused; re-uploading a file saved earlier
+# saves it again (save_user_dataset skips the write when the stored content hash already matches)
+def persist_in_background(username, upload_hash, df):
+    return submit_job("Save dataset", persist_job, username, df, owner=username,
+                      dedupe_key=('persist', username, upload_hash))
+
+# Function to look up the persistence status of an upload: 'running', 'saved', 'unchanged' or 'failed: <reason>'
+def persist_status(username, upload_hash):
+    job = get_runner().get_by_key(('persist', username, upload_hash))
+    if job is None:
+        return None
+    if job.status == DONE:
+        return job.result
+    if job.status in (FAILED, CANCELLED):
+        return f"failed: {job.error or job.status}"
+    return 'running'
+
+# Function run as a background job: insert an upload into inventory_data, reporting rows/s as progress
+# Cancelling stops at the next chunk; rows already committed (every INSERT_COMMIT_SIZE rows) are kept
+# The shared cube and alert engine then fold the new rows in through the watermark, like any other write
+def ingest_job(job, df):
+    def report(inserted, total_rows, rows_per_second):
+        job.report(inserted / total_rows if total_rows else 1.0,
+                   f"Inserted {inserted:,} of {total_rows:,} rows ({rows_per_second:,.0f} rows/s)")
+    insert_data_from_csv(df, progress_callback=report, show_summary=False)
+    refresh_shared()
+    return len(df)
+
+# Function to insert an upload into inventory_data as a background job (once per file hash)
+def ingest_in_background(username, upload_hash, df):
+    return submit_job("Import into database", ingest_job, df, owner=username,
+                      dedupe_key=('ingest', username, upload_hash), once=True)
@@ -0,0 +1,158 @@
+import gzip
+import io
+import zipfile
+import pandas as pd
+from perf import span
+
+# Rows per chunk read from MySQL or sliced from a session frame
+EXPORT_CHUNK_ROWS = 100000
+
+# Excel's sheet limit (header row included)
+XLSX_MAX_ROWS = 1048576
+
+# Export formats: label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ('csv', 'text/csv'),
+    "CSV (gzip)": ('csv.gz', 'application/gzip'),
+    "CSV (zip)": ('zip', 'application/zip'),
+    "Parquet": ('parquet', 'application/vnd.apache.parquet'),
+    "Excel": ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+# Function to slice an in-memory frame into chunks
+def frame_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    for offset in range(0, len(df), chunk_rows):
+        yield df.iloc[offset:offset + chunk_rows]
+
+# Function to stream the rows of a frame matching {column: value} filters ('All' means no filter), chunk by chunk
+# A 'Year' filter matches the year of 'Date Sold'
+def filtered_frame_chunks(df, filters, chunk_rows=EXPORT_CHUNK_ROWS):
+    for chunk in frame_chunks(df, chunk_rows):
+        for column, value in filters.items():
+            if value is None or value == 'All':
+                continue
+            if column == 'Year':
+                chunk = chunk[pd.to_datetime(chunk['Date Sold'], errors='coerce').dt.year == value]
+            else:
+                chunk = chunk[chunk[column] == value]
+        if len(chunk):
+            yield chunk
+
+# Function to write chunks as CSV text (header once) to a text stream
+def write_csv(chunks, stream):
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(stream, index=False, header=header)
+        header = False
+
+# Function to turn the chunk's categorical columns into plain values for writers that need them
+def _plain(chunk):
+    categorical = [col for col in chunk.columns if isinstance(chunk[col].dtype, pd.CategoricalDtype)]
+    return chunk.astype({col: object for col in categorical}) if categorical else chunk
+
+# Function to write chunks as Parquet, one row group per chunk
+# The schema comes from the first chunk; columns that were all null there are stored as strings
+def write_parquet(chunks, binary):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    try:
+        for chunk in chunks:
+            chunk = _plain(chunk)
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                for i, field in enumerate(schema):
+                    if pa.types.is_null(field.type):
+                        schema = schema.set(i, pa.field(field.name, pa.string()))
+                writer = pq.ParquetWriter(binary, schema, compression='zstd')
+            for field in schema:
+                if pa.types.is_string(field.type) and chunk[field.name].dtype != object:
+                    values = chunk[field.name]
+                    chunk = chunk.assign(**{field.name: values.astype(str).where(values.notna(), None)})
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False, safe=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+# Function to write chunks to a single-sheet workbook in openpyxl's streaming (write-only) mode
+def write_xlsx(chunks, binary):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Export")
+    rows_written = 0
+    for chunk in chunks:
+        if rows_written == 0:
+            sheet.append([str(col) for col in chunk.columns])
+            rows_written = 1
+        rows_written += len(chunk)
+        if rows_written > XLSX_MAX_ROWS:
+            raise ValueError(f"Excel sheets hold at most {XLSX_MAX_ROWS - 1:,} rows; export as CSV or Parquet instead.")
+        chunk = _plain(chunk).astype(object)
+        for row in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(binary)
+
+# Function to write chunks in an export format into a binary stream
+# name is the file name used inside zip archives
+def write_export(chunks, export_format, binary, name="export.csv"):
+    if export_format == "CSV":
+        stream = io.TextIOWrapper(binary, encoding='utf-8', newline='', write_through=True)
+        write_csv(chunks, stream)
+        stream.detach()
+    elif export_format == "CSV (gzip)":
+        with gzip.GzipFile(fileobj=binary, mode='wb', compresslevel=6) as compressed:
+            stream = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+            write_csv(chunks, stream)
+            stream.flush()
+            stream.detach()
+    elif export_format == "CSV (zip)":
+        with zipfile.ZipFile(binary, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(name, 'w', force_zip64=True) as member:
+                stream = io.TextIOWrapper(member, encoding='utf-8', newline='')
+                write_csv(chunks, stream)
+                stream.flush()
+                stream.detach()
+    elif export_format == "Parquet":
+        write_parquet(chunks, binary)
+    elif export_format == "Excel":
+        write_xlsx(chunks, binary)
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+# Function to build an export into an in-memory file (rewound), which st.download_button's deferred callable can return
+# Rows are encoded one chunk at a time, but the finished file is held in memory: Streamlit reads whatever the
+# callable returns into its media file store, so memory for a download grows with the export's encoded size.
+# The compressed formats (CSV gzip/zip, Parquet) keep that copy small.
+# empty is a zero-row frame with the export's columns, written when there are no chunks so that a file with
+# no matching rows still has its header (CSV, Excel) or schema (Parquet)
+def build_export(chunks, export_format, name="export.csv", empty=None):
+    output = io.BytesIO()
+    with span(f"export.{EXPORT_FORMATS[export_format][0]}") as sizes:
+        counted = _count_rows(chunks, sizes, empty)
+        write_export(counted, export_format, output, name)
+        sizes['bytes'] = output.tell()
+    output.seek(0)
+    return output
+
+# Function to pass chunks through while adding up their rows on a span (yielding empty if there were none)
+def _count_rows(chunks, sizes, empty=None):
+    sizes['rows'] = 0
+    written = False
+    for chunk in chunks:
+        sizes['rows'] += len(chunk)
+        written = True
+        yield chunk
+    if not written and empty is not None:
+        yield empty
+
+# Function to get a download file name for an export format
+def export_file_name(base, export_format):
+    return f"{base}.{EXPORT_FORMATS[export_format][0]}"
+
+# Function to get the MIME type of an export format
+def export_mime(export_format):
+    return EXPORT_FORMATS[export_format][1]
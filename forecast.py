@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from cache import LRUCache
+from loader import MONTH_ORDER
+
+# Demand is forecast per (product, location), one column per calendar month
+KEY_COLUMNS = ['Product Sold', 'Location']
+DEMAND_MEASURE = 'quantity sold'
+
+# Forecasting parameters
+MOVING_AVERAGE_WINDOW = 3
+SMOOTHING_ALPHA = 0.3
+TREND_BETA = 0.1
+FORECAST_HORIZON = 3
+
+# Restock to cover this many forecast periods, plus safety stock at this service level (z-score)
+COVER_PERIODS = 2
+SERVICE_LEVEL_Z = 1.65
+
+
+# Function to build the product x period demand matrix from the rollup cube
+# Returns (keys, periods, matrix); months without sales are zero
+def demand_matrix(cube, measure=DEMAND_MEASURE):
+    table = cube.rollup(KEY_COLUMNS + ['Year', 'Month'], sums=[measure])
+    month_number = table['Month'].astype(object).map({month: i for i, month in enumerate(MONTH_ORDER)})
+    period = pd.to_numeric(table['Year'], errors='coerce') * 12 + month_number
+    codes, keys = pd.MultiIndex.from_frame(table[KEY_COLUMNS].astype(object)).factorize()
+    valid = (period.notna() & (codes >= 0)).to_numpy()
+    if not valid.any():
+        return pd.MultiIndex.from_arrays([[], []], names=KEY_COLUMNS), pd.PeriodIndex([], freq='M'), np.zeros((0, 0))
+
+    period = period[valid].astype('int64').to_numpy()
+    first = period.min()
+    matrix = np.zeros((len(keys), period.max() - first + 1))
+    np.add.at(matrix, (codes[valid], period - first), table[measure].to_numpy(dtype='float64')[valid])
+    periods = pd.period_range(pd.Period(year=first // 12, month=first % 12 + 1, freq='M'), periods=matrix.shape[1])
+    return keys.set_names(KEY_COLUMNS), periods, matrix
+
+# Function to compute the trailing moving average of every row at once (shorter windows at the start)
+def moving_average(matrix, window=MOVING_AVERAGE_WINDOW):
+    n_periods = matrix.shape[1]
+    totals = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    end = np.arange(1, n_periods + 1)
+    start = np.maximum(end - window, 0)
+    return (totals[:, end] - totals[:, start]) / (end - start)
+
+# Function to run Holt's linear exponential smoothing over every row at once
+# Loops over periods only; returns (one-step-ahead fitted values, final level, final trend)
+def exponential_smoothing(matrix, alpha=SMOOTHING_ALPHA, beta=TREND_BETA):
+    fitted = np.empty_like(matrix)
+    if not matrix.shape[1]:
+        return fitted, np.zeros(matrix.shape[0]), np.zeros(matrix.shape[0])
+    level = matrix[:, 0].copy()
+    trend = np.zeros(matrix.shape[0])
+    fitted[:, 0] = level
+    for t in range(1, matrix.shape[1]):
+        fitted[:, t] = level + trend
+        new_level = alpha * matrix[:, t] + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    return fitted, level, trend
+
+# Function to compute restock quantities: forecast demand over the cover periods plus safety stock, less stock
+def restock_quantities(forecast, residual_std, stock, cover_periods=COVER_PERIODS, z=SERVICE_LEVEL_Z):
+    demand = forecast[:, :cover_periods].sum(axis=1)
+    safety = z * residual_std * np.sqrt(cover_periods)
+    return np.ceil(np.clip(demand + safety - np.nan_to_num(stock), 0, None))
+
+
+# Forecasts for every (product, location) of a dataset, computed in one batch
+class DemandForecast:
+    def __init__(self, keys, periods, demand, stock=None, horizon=FORECAST_HORIZON):
+        self.keys = keys
+        self.periods = periods
+        self.demand = demand
+        self.moving_avg = moving_average(demand)
+        self.fitted, self.level, self.trend = exponential_smoothing(demand)
+
+        steps = np.arange(1, horizon + 1)
+        self.forecast = np.clip(self.level[:, None] + self.trend[:, None] * steps, 0, None)
+        self.forecast_periods = (periods[-1] + steps) if len(periods) else pd.PeriodIndex([], freq='M')
+
+        residuals = (demand - self.fitted)[:, 1:]
+        self.residual_std = residuals.std(axis=1) if residuals.shape[1] else np.zeros(len(keys))
+
+        # Current stock per key (from the alert engine's latest snapshots); unknown stock counts as zero
+        self.stock = np.zeros(len(keys))
+        if stock is not None and len(stock):
+            positions = stock.index.get_indexer(keys)
+            self.stock = np.where(positions >= 0, stock.to_numpy(dtype='float64')[positions], 0)
+        self.restock = restock_quantities(self.forecast, self.residual_std, self.stock)
+
+    # Function to get the growth rate of the moving average over the last period, per key
+    def growth_rate(self):
+        if self.moving_avg.shape[1] < 2:
+            return np.full(len(self.keys), np.nan)
+        previous, last = self.moving_avg[:, -2], self.moving_avg[:, -1]
+        return np.divide(last - previous, previous, out=np.full(len(previous), np.nan), where=previous > 0)
+
+    # Function to get one row per (product, location) with its forecast and restock quantity
+    def table(self):
+        table = self.keys.to_frame(index=False)
+        table['Moving Avg'] = self.moving_avg[:, -1] if self.moving_avg.shape[1] else np.nan
+        table['Smoothed Level'] = self.level
+        table['Trend'] = self.trend
+        table['Growth Rate'] = self.growth_rate()
+        table['Next Period Forecast'] = self.forecast[:, 0] if self.forecast.shape[1] else np.nan
+        table['Current Stock'] = self.stock
+        table['Restock Quantity'] = self.restock
+        return table
+
+    # Function to get the restock recommendations, largest quantity first
+    def restock_table(self):
+        table = self.table()
+        table = table[table['Restock Quantity'] > 0]
+        return table.sort_values('Restock Quantity', ascending=False, ignore_index=True)
+
+    # Function to total actual and forecast demand per period over all keys (for charting)
+    def totals(self):
+        actual = pd.Series(self.demand.sum(axis=0), index=self.periods.astype(str), name='Actual')
+        forecast = pd.Series(self.forecast.sum(axis=0), index=self.forecast_periods.astype(str), name='Forecast')
+        return pd.concat([actual, forecast], axis=1)
+
+
+# Function to build the forecast for a dataset from its rollup cube and current stock per key
+def build_forecast(cube, stock=None):
+    keys, periods, demand = demand_matrix(cube)
+    return DemandForecast(keys, periods, demand, stock)
+
+
+# Number of dataset versions whose forecasts are kept in memory
+MAX_CACHED_FORECASTS = 16
+
+_forecasts = LRUCache(MAX_CACHED_FORECASTS)
+
+# Function to get the forecast for a dataset version, computed once (shared across sessions)
+# cube_builder and stock_builder are only called on a miss
+def get_forecast(version, cube_builder, stock_builder=lambda: None):
+    return _forecasts.get_or_build(version, lambda: build_forecast(cube_builder(), stock_builder()))
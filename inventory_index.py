@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from alerts import is_low_stock
+
+# Columns shown in the Inventory Monitoring table
+INVENTORY_COLUMNS = ['Product Sold', 'Location', 'Stock levels', 'Reorder Levels']
+
+# Columns with a prebuilt value -> row positions index
+INDEXED_COLUMNS = ['Product Sold', 'Location']
+
+
+# Group indices over the inventory frame so filters never scan every row
+class InventoryIndex:
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.df = df
+        self.size = len(df)
+        self.reorder = df['Reorder Levels'].to_numpy(dtype='float64')
+        self.thresholds_version = None
+        self.groups = {}
+        for col in columns:
+            indices = df.groupby(col, observed=True, sort=True).indices
+            self.groups[col] = {value: np.asarray(positions) for value, positions in indices.items()}
+
+    # Function to join the stored reorder thresholds onto every row (once per thresholds version)
+    def apply_thresholds(self, table, version):
+        if self.thresholds_version != version:
+            self.reorder = table.reorder_levels(self.df)
+            self.thresholds_version = version
+        return self
+
+    # Function to extend the index to rows appended to the end of the frame
+    def extend(self, df, table):
+        start = self.size
+        new_rows = df.iloc[start:]
+        for col, groups in self.groups.items():
+            for value, positions in new_rows.groupby(col, observed=True, sort=False).indices.items():
+                positions = np.asarray(positions) + start
+                groups[value] = np.concatenate([groups[value], positions]) if value in groups else positions
+            self.groups[col] = dict(sorted(groups.items(), key=lambda item: str(item[0])))
+        self.reorder = np.concatenate([self.reorder, table.reorder_levels(new_rows)])
+        self.df = df
+        self.size = len(df)
+        return self
+
+    # Function to list the indexed values of a column (for filter widgets)
+    def values(self, column):
+        return list(self.groups[column].keys())
+
+    # Function to get the row positions matching any of the selected values of one column
+    def positions_for(self, column, selected):
+        parts = [self.groups[column][value] for value in selected if value in self.groups[column]]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    # Function to resolve multi-select filters ({column: [values]}, empty means all) to row positions
+    def select(self, filters):
+        positions = None
+        for column, selected in filters.items():
+            if not selected:
+                continue
+            matched = self.positions_for(column, selected)
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        return np.arange(self.size) if positions is None else positions
+
+    # Function to keep only the positions whose stock is at or below the reorder level
+    def below_reorder(self, positions):
+        stock = self.df['Stock levels'].to_numpy()[positions]
+        reorder = self.reorder[positions]
+        return positions[is_low_stock(stock, reorder)]
+
+    # Function to sort the selected positions and materialize a single page of rows
+    def page(self, positions, page, page_size, sort_by=None, ascending=True, columns=INVENTORY_COLUMNS):
+        if sort_by is not None and len(positions):
+            if sort_by == 'Reorder Levels':
+                keys = self.reorder[positions]
+            else:
+                column = self.df[sort_by]
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    column = column.cat.codes
+                keys = column.to_numpy()[positions]
+            order = np.argsort(keys, kind='stable')
+            if not ascending:
+                order = order[::-1]
+            positions = positions[order]
+
+        start = page * page_size
+        page_positions = positions[start:start + page_size]
+        rows = self.df.iloc[page_positions][columns].copy()
+        if 'Reorder Levels' in columns:
+            rows['Reorder Levels'] = self.reorder[page_positions]
+        return rows
+
+
+# Function to count the pages needed for a number of rows
+def page_count(total_rows, page_size):
+    return max(1, -(-total_rows // page_size))
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from perf import begin_rerun, end_rerun
+
+# Worker threads shared by every session (pandas, pyarrow, zlib and the MySQL driver release the GIL for most of their work)
+JOB_WORKERS = int(os.environ.get("INVENTORY_JOB_WORKERS", 4))
+
+# Finished jobs kept for later reruns to collect (oldest are dropped beyond this many)
+MAX_FINISHED_JOBS = 500
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+# Raised inside a job (by Job.report / Job.check) once cancellation has been requested
+class JobCancelled(Exception):
+    pass
+
+
+# One unit of background work; the task receives the Job to report progress and check for cancellation
+class Job:
+    def __init__(self, name, owner=None, dedupe_key=None):
+        self.job_id = uuid.uuid4().hex
+        self.name = name
+        self.owner = owner
+        self.dedupe_key = dedupe_key
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    # Function to check whether cancellation was requested, raising JobCancelled if so
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    # Function to record progress (0..1) and an optional message; also a cancellation point
+    def report(self, fraction, message=None):
+        self.check()
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    # Function to block until the job has finished (or the timeout passes); returns True if it finished
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    # Function to get a plain copy of the job's state for display
+    def snapshot(self):
+        return {
+            'job_id': self.job_id, 'name': self.name, 'owner': self.owner, 'status': self.status,
+            'progress': self.progress, 'message': self.message, 'error': self.error,
+            'created': self.created, 'started': self.started, 'finished': self.finished,
+        }
+
+
+# Process-wide pool of worker threads with job IDs, progress, cancellation and retained results
+class JobRunner:
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    # Function to queue task(job, *args, **kwargs); returns the job ID
+    # With a dedupe_key, a queued or running job for the same key is reused instead (and a done one too if once=True)
+    def submit(self, name, task, *args, owner=None, dedupe_key=None, once=False, **kwargs):
+        reusable = (QUEUED, RUNNING, DONE) if once else (QUEUED, RUNNING)
+        with self._lock:
+            if dedupe_key is not None:
+                existing = self._jobs.get(self._by_key.get(dedupe_key))
+                if existing is not None and existing.status in reusable:
+                    return existing.job_id
+            job = Job(name, owner, dedupe_key)
+            self._jobs[job.job_id] = job
+            if dedupe_key is not None:
+                self._by_key[dedupe_key] = job.job_id
+            self._prune()
+        self._executor.submit(self._run, job, task, args, kwargs)
+        return job.job_id
+
+    # Function to run one job on a worker thread and record how it ended
+    def _run(self, job, task, args, kwargs):
+        if job._cancel.is_set():
+            job.status, job.finished = CANCELLED, time.time()
+            job._finished.set()
+            return
+        job.status, job.started = RUNNING, time.time()
+        begin_rerun(f"job: {job.name}")
+        try:
+            job.result = task(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        end_rerun()
+        job.finished = time.time()
+        job._finished.set()
+
+    # Function to drop the oldest finished jobs beyond MAX_FINISHED_JOBS
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            job = self._jobs.pop(job_id)
+            if job.dedupe_key is not None and self._by_key.get(job.dedupe_key) == job_id:
+                del self._by_key[job.dedupe_key]
+
+    # Function to get a job by ID (None if unknown or pruned)
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # Function to get the job last submitted under a dedupe key
+    def get_by_key(self, dedupe_key):
+        with self._lock:
+            return self._jobs.get(self._by_key.get(dedupe_key))
+
+    # Function to request cancellation; queued jobs never start, running ones stop at their next progress report
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return False
+        job._cancel.set()
+        return True
+
+    # Function to forget a job once its result has been collected (frees large results)
+    def discard(self, job_id):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None and job.dedupe_key is not None and self._by_key.get(job.dedupe_key) == job_id:
+                del self._by_key[job.dedupe_key]
+
+    # Function to list one owner's jobs, newest first
+    def jobs_for(self, owner):
+        with self._lock:
+            return [job for job in reversed(self._jobs.values()) if job.owner == owner]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+# Function to get the process-wide job runner (created on first use)
+def get_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+# Function to queue a background job on the shared runner; returns the job ID
+def submit_job(name, task, *args, owner=None, dedupe_key=None, once=False, **kwargs):
+    return get_runner().submit(name, task, *args, owner=owner, dedupe_key=dedupe_key, once=once, **kwargs)
+
+# Function to look up a job on the shared runner
+def get_job(job_id):
+    return get_runner().get(job_id) if job_id else None
+
+# Function to cancel a job on the shared runner
+def cancel_job(job_id):
+    return get_runner().cancel(job_id)
+
+# Function to forget a job on the shared runner
+def discard_job(job_id):
+    get_runner().discard(job_id)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+# Low-cardinality text columns stored as categoricals
+CATEGORY_COLUMNS = ['Product Sold', 'Location', 'Season', 'Customer Segment', 'payment_method',
+                    'Gender', 'Availability', 'Restock Needed']
+
+# Columns parsed to datetime once at load time
+DATE_COLUMNS = ['Date Sold', 'Restock Date', 'invoice_date']
+
+# Other text columns become categoricals only when they repeat this much
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Function to measure the deep memory usage of a DataFrame in bytes
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum())
+
+# Function to convert the inventory DataFrame to compact dtypes
+def optimize_dtypes(df):
+    df = df.copy()
+
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    if 'Month' in df.columns:
+        df['Month'] = pd.Categorical(df['Month'], categories=MONTH_ORDER, ordered=True)
+
+    for col in df.columns:
+        series = df[col]
+        if col in DATE_COLUMNS or col == 'Month' or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+
+        # Integers are downcast losslessly; floats keep float64 because this frame is also what gets
+        # saved as Parquet and imported into inventory_data, and float32 would change the stored values
+        if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            if col in CATEGORY_COLUMNS or (len(series) and series.nunique() / len(series) <= CATEGORY_MAX_UNIQUE_RATIO):
+                df[col] = series.astype('category')
+
+    return df
+
+# Function to load a DataFrame into its optimized in-memory form and report the memory saved
+def prepare_inventory_frame(df):
+    before = frame_memory(df)
+    df = optimize_dtypes(df)
+    after = frame_memory(df)
+    return df, {'before_bytes': before, 'after_bytes': after}
+
+# Function to format a memory report for display
+def describe_memory(report):
+    before_mb = report['before_bytes'] / 1024 ** 2
+    after_mb = report['after_bytes'] / 1024 ** 2
+    saved = 100 * (1 - report['after_bytes'] / report['before_bytes']) if report['before_bytes'] else 0
+    return f"In-memory dataset: {before_mb:.1f} MB → {after_mb:.1f} MB ({saved:.0f}% smaller)"
+
+# Function to bring new rows to an optimized frame's columns and compact dtypes, leaving the frame untouched
+# Categoricals keep the frame's categories (plus any new values), so concat_rows only appends categories
+def align_rows(df, new_rows):
+    new_rows = optimize_dtypes(new_rows.reindex(columns=df.columns))
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            if not df[col].cat.ordered:
+                categories = categories.append(pd.Index(new_rows[col].dropna().unique()).difference(categories))
+            new_rows[col] = pd.Categorical(new_rows[col], categories=categories, ordered=df[col].cat.ordered)
+        elif new_rows[col].dtype != df[col].dtype:
+            dtype = df[col].dtype
+            if pd.api.types.is_integer_dtype(dtype):
+                dtype = appended_integer_dtype(dtype, new_rows[col])
+            try:
+                new_rows[col] = new_rows[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return new_rows
+
+# Function to pick the dtype for values appended to an integer column: the column's width (widened when a
+# value does not fit) and the nullable Int8/Int16/... form when some are missing, so the column stays an integer
+# Non-integral values keep their own dtype
+def appended_integer_dtype(dtype, values):
+    present = pd.to_numeric(values, errors='coerce').dropna()
+    if len(present):
+        if not (present == np.floor(present)).all():
+            return values.dtype
+        needed = pd.to_numeric(present.astype('int64'), downcast='integer').dtype
+        dtype = np.result_type(np.dtype(str(dtype).lower()), needed)
+    else:
+        dtype = np.dtype(str(dtype).lower())
+    if values.isna().any():
+        return pd.api.types.pandas_dtype(dtype.name.replace('int', 'Int').replace('uInt', 'UInt'))
+    return dtype
+
+# Function to join a frame and the aligned rows appended after it into one frame, column by column
+# Categoricals are unioned (existing codes are kept) instead of falling back to object columns
+def concat_rows(frames):
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = pd.Series(union_categoricals(parts))
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
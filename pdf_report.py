@@ -0,0 +1,112 @@
+import pandas as pd
+from fpdf import FPDF
+from cache import LRUCache
+from perf import span
+
+# Page layout (A4 portrait, millimetres)
+PAGE_MARGIN = 10
+ROW_HEIGHT = 8
+MIN_COLUMN_WIDTH = 30
+MAX_COLUMN_WIDTH = 60
+FONT_SIZE = 9
+
+# Number of rendered reports kept in memory
+MAX_CACHED_PDFS = 64
+
+_pdf_cache = LRUCache(MAX_CACHED_PDFS)
+
+
+# Function to format every cell of the table as text in one vectorized pass
+def format_cells(df):
+    formatted = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_float_dtype(values):
+            formatted[col] = values.map(lambda v: "" if pd.isna(v) else f"{v:,.2f}")
+        else:
+            formatted[col] = values.astype(str)
+    return pd.DataFrame(formatted).to_numpy()
+
+# Function to split the columns into groups that fit the page width
+def column_groups(pdf, columns, cell_texts):
+    usable_width = pdf.w - 2 * PAGE_MARGIN
+    widths = []
+    for i, col in enumerate(columns):
+        longest = max([pdf.get_string_width(str(col))] +
+                      [pdf.get_string_width(text) for text in cell_texts[:200, i]])
+        widths.append(min(max(longest + 4, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH))
+
+    groups, current, current_width = [], [], 0
+    for i, width in enumerate(widths):
+        if current and current_width + width > usable_width:
+            groups.append(current)
+            current, current_width = [], 0
+        current.append(i)
+        current_width += width
+    if current:
+        groups.append(current)
+    return groups, widths
+
+# Function to fit text into a cell, trimming it when it is too wide
+def fit_text(pdf, text, width):
+    if pdf.get_string_width(text) <= width - 2:
+        return text
+    while text and pdf.get_string_width(text + "...") > width - 2:
+        text = text[:-1]
+    return text + "..."
+
+# Function to draw a table header row
+def draw_header(pdf, columns, group, widths):
+    pdf.set_font("Arial", style="B", size=FONT_SIZE)
+    for i in group:
+        pdf.cell(widths[i], ROW_HEIGHT, fit_text(pdf, str(columns[i]), widths[i]), 1)
+    pdf.ln()
+    pdf.set_font("Arial", size=FONT_SIZE)
+
+# Function to render a report table to PDF bytes entirely in memory
+def render_pdf_report(title, df):
+    pdf = FPDF()
+    pdf.set_margins(PAGE_MARGIN, PAGE_MARGIN)
+    pdf.set_auto_page_break(False)
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, txt=title, ln=True, align='C')
+
+    columns = list(df.columns)
+    cell_texts = format_cells(df)
+    pdf.set_font("Arial", size=FONT_SIZE)
+    groups, widths = column_groups(pdf, columns, cell_texts)
+    bottom = pdf.h - PAGE_MARGIN
+
+    # Wide tables are printed one column group after another, long ones repeat the header per page
+    for group_number, group in enumerate(groups):
+        if group_number:
+            pdf.add_page()
+        draw_header(pdf, columns, group, widths)
+        for row in cell_texts:
+            if pdf.get_y() + ROW_HEIGHT > bottom:
+                pdf.add_page()
+                draw_header(pdf, columns, group, widths)
+            for i in group:
+                pdf.cell(widths[i], ROW_HEIGHT, fit_text(pdf, row[i], widths[i]), 1)
+            pdf.ln()
+
+    output = pdf.output(dest='S')
+    return output.encode('latin-1') if isinstance(output, str) else bytes(output)
+
+# Function to get a report's PDF bytes, rendering only on a cache miss
+# key is (dataset version, report type, month, season, location)
+def cached_pdf_report(key, title, df):
+    def build():
+        with span('pdf.render', rows=len(df)) as sizes:
+            pdf = render_pdf_report(title, df)
+            sizes['bytes'] = len(pdf)
+        return pdf
+    return _pdf_cache.get_or_build(key, build)
+
+# Function to drop cached PDFs for a dataset version (or all of them)
+def invalidate_pdf_reports(version=None):
+    if version is None:
+        _pdf_cache.invalidate()
+    else:
+        _pdf_cache.invalidate(predicate=lambda key: key[0] == version)
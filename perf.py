@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+
+# Spans kept in memory (oldest are dropped first)
+MAX_SPANS = int(os.environ.get("INVENTORY_PERF_MAX_SPANS", 50000))
+
+# Percentiles shown on the Performance page and in the metrics endpoint
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Users allowed to see the Performance page (comma-separated; nobody unless configured, since sign-up is open)
+ADMIN_USERS = {name.strip() for name in os.environ.get("INVENTORY_ADMIN_USERS", "").split(",") if name.strip()}
+
+# Port of the local Prometheus-style text endpoint (disabled when unset)
+METRICS_PORT = os.environ.get("INVENTORY_METRICS_PORT")
+
+_spans = deque(maxlen=MAX_SPANS)
+_context = threading.local()
+
+# Running totals per (page, stage) since the process started: [count, seconds, rows, bytes]
+# Unlike _spans nothing is dropped, so the Prometheus counters only ever increase
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+# Function to mark the start of a script rerun (or background job) for the spans recorded on this thread
+def begin_rerun(page):
+    _context.page = page
+    _context.rerun = uuid.uuid4().hex[:12]
+    _context.started = time.perf_counter()
+
+# Function to record the whole rerun as one span and clear the thread's context
+def end_rerun():
+    started = getattr(_context, 'started', None)
+    if started is not None:
+        record('rerun', time.perf_counter() - started)
+    _context.page = _context.rerun = _context.started = None
+
+# Function to record one finished span for the current page and rerun
+def record(stage, seconds, rows=None, nbytes=None):
+    page = getattr(_context, 'page', None) or 'background'
+    _spans.append({
+        'ts': time.time(),
+        'rerun': getattr(_context, 'rerun', None),
+        'page': page,
+        'stage': stage,
+        'seconds': seconds,
+        'rows': rows,
+        'bytes': nbytes,
+    })
+    with _totals_lock:
+        totals = _totals.setdefault((page, stage), [0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += rows or 0
+        totals[3] += nbytes or 0
+
+# Timed block; rows and bytes can be filled in on the yielded dict before the block ends
+@contextmanager
+def span(stage, rows=None, nbytes=None):
+    sizes = {'rows': rows, 'bytes': nbytes}
+    start = time.perf_counter()
+    try:
+        yield sizes
+    finally:
+        record(stage, time.perf_counter() - start, sizes['rows'], sizes['bytes'])
+
+# Function to get the recorded spans as a DataFrame (optionally only the last window_seconds)
+def spans_frame(window_seconds=None):
+    frame = pd.DataFrame(list(_spans), columns=['ts', 'rerun', 'page', 'stage', 'seconds', 'rows', 'bytes'])
+    if window_seconds is not None:
+        frame = frame[frame['ts'] >= time.time() - window_seconds]
+    return frame
+
+# Function to summarize spans per (page, stage): count, mean and percentiles in milliseconds, rows and bytes
+def percentiles(window_seconds=None):
+    frame = spans_frame(window_seconds)
+    columns = ['page', 'stage', 'count', 'mean ms'] + [f"p{int(q * 100)} ms" for q in QUANTILES] + ['rows', 'bytes']
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = frame.groupby(['page', 'stage'])
+    summary = grouped['seconds'].agg(['count', 'mean'])
+    summary['mean ms'] = summary.pop('mean') * 1000
+    for q in QUANTILES:
+        summary[f"p{int(q * 100)} ms"] = grouped['seconds'].quantile(q) * 1000
+    summary['rows'] = grouped['rows'].sum(min_count=1)
+    summary['bytes'] = grouped['bytes'].sum(min_count=1)
+    return summary.reset_index()[columns].sort_values('p90 ms', ascending=False, ignore_index=True)
+
+# Function to export the recorded spans as JSON lines
+def to_jsonl(window_seconds=None):
+    frame = spans_frame(window_seconds).astype({'rows': 'Int64', 'bytes': 'Int64'}).astype(object)
+    frame = frame.where(frame.notna(), None)
+    return "".join(json.dumps(row) + "\n" for row in frame.to_dict('records'))
+
+# Function to escape a Prometheus label value
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Function to render span summaries and connection pool stats in the Prometheus text format
+# Quantiles cover the spans still in memory; _sum, _count and the *_total counters cover the whole process
+def prometheus_text(pool_stats=None):
+    frame = spans_frame()
+    quantiles = {key: group['seconds'].to_numpy() for key, group in frame.groupby(['page', 'stage'])}
+    with _totals_lock:
+        totals = {key: list(values) for key, values in _totals.items()}
+
+    lines = ["# TYPE inventory_span_seconds summary"]
+    for (page, stage), (count, seconds, _, _) in totals.items():
+        labels = f'page="{_label(page)}",stage="{_label(stage)}"'
+        recent = quantiles.get((page, stage))
+        if recent is not None:
+            for q in QUANTILES:
+                lines.append(f'inventory_span_seconds{{{labels},quantile="{q}"}} {np.quantile(recent, q):.6f}')
+        lines.append(f"inventory_span_seconds_sum{{{labels}}} {seconds:.6f}")
+        lines.append(f"inventory_span_seconds_count{{{labels}}} {count}")
+    for metric, position in (('inventory_span_rows_total', 2), ('inventory_span_bytes_total', 3)):
+        lines.append(f"# TYPE {metric} counter")
+        for (page, stage), values in totals.items():
+            lines.append(f'{metric}{{page="{_label(page)}",stage="{_label(stage)}"}} {values[position]}')
+    for name, value in (pool_stats or {}).items():
+        lines.append(f"# TYPE inventory_db_pool_{name} gauge")
+        lines.append(f"inventory_db_pool_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+_server = None
+_server_lock = threading.Lock()
+
+# Function to serve prometheus_text() on 127.0.0.1:port at /metrics (started once per process)
+def start_metrics_server(port=METRICS_PORT, pool_stats=None):
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = prometheus_text(pool_stats() if pool_stats else None).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        _server = ThreadingHTTPServer(('127.0.0.1', int(port)), MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
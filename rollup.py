@@ -0,0 +1,149 @@
+import pandas as pd
+from cache import LRUCache
+from database import read_query, table_column, WATERMARK_COLUMN
+from loader import optimize_dtypes, align_rows, concat_rows
+from perf import span
+
+# Dimensions the cube is grouped by ('Year' is derived from 'Date Sold')
+DIMENSIONS = ['Month', 'Season', 'Location', 'Product Sold', 'Customer Segment', 'Year']
+
+# Measures stored as sums
+SUM_MEASURES = ['Total Revenue', 'quantity sold', 'Purchase Frequency(Monthly)', 'Stock levels']
+
+# Measures whose mean is served as sum / non-null count
+MEAN_MEASURES = ['Sales Growth Rate', 'Predicted Sales', 'Profit']
+
+# Row count per cell
+COUNT_MEASURES = ['Rows']
+
+
+# Multi-dimensional aggregate of the inventory data that pages roll up instead of rescanning rows
+# Every measure is additive, so a cell may appear more than once (rows appended by extend_cube) and the
+# queries below still return the same numbers
+class RollupCube:
+    def __init__(self, table, appended=0):
+        self.table = table
+        self.appended = appended
+
+    # Function to list the distinct values of one dimension
+    def dimension_values(self, dimension):
+        return list(self.table[dimension].dropna().drop_duplicates().sort_values())
+
+    # Function to keep only the cube cells matching {dimension: value} filters ('All' means no filter)
+    def filter(self, filters=None):
+        table = self.table
+        for dimension, value in (filters or {}).items():
+            if value is None or value == 'All':
+                continue
+            table = table[table[dimension] == value]
+        return table
+
+    # Function to roll the cube up to the given dimensions
+    # sums/counts come back as totals, means as the weighted mean over the underlying rows
+    def rollup(self, group_by, sums=(), means=(), counts=(), filters=None):
+        table = self.filter(filters)
+        sum_columns = list(sums) + list(counts) + [f"{col} count" for col in means] + list(means)
+        sum_columns = list(dict.fromkeys(sum_columns))
+
+        if group_by:
+            result = table.groupby(group_by, observed=True)[sum_columns].sum()
+        else:
+            result = table[sum_columns].sum().to_frame().T
+
+        for col in means:
+            result[col] = result[col] / result[f"{col} count"].where(result[f"{col} count"] > 0)
+        output_columns = list(dict.fromkeys(list(sums) + list(counts) + list(means)))
+        return result[output_columns].reset_index() if group_by else result[output_columns]
+
+    # Function to total one measure over the (optionally filtered) cube
+    def total(self, measure, filters=None):
+        return self.filter(filters)[measure].sum()
+
+
+# Function to build the cube from an in-memory DataFrame
+def build_cube(df):
+    with span('cube.build', rows=len(df)):
+        return _build_cube(df)
+
+# Function to group the rows into cube cells
+def _build_cube(df):
+    work = pd.DataFrame({dim: df[dim] for dim in DIMENSIONS if dim != 'Year'})
+    work['Year'] = pd.to_datetime(df['Date Sold'], errors='coerce').dt.year
+
+    for col in SUM_MEASURES:
+        work[col] = df[col]
+    for col in MEAN_MEASURES:
+        work[col] = df[col]
+        work[f"{col} count"] = df[col].notna().astype('int64')
+
+    work['Rows'] = 1
+
+    return RollupCube(consolidate(work))
+
+# Function to sum rows sharing the same dimension values into one cell each
+def consolidate(table):
+    return optimize_dtypes(table.groupby(DIMENSIONS, observed=True, dropna=False).sum(min_count=0).reset_index())
+
+# Function to build the GROUP BY query behind the cube
+# through limits it to rows up to a watermark, so later rows can be folded in with extend_cube
+def cube_query(through=None):
+    select_parts = [f"{table_column(dim)} AS `{dim}`" for dim in DIMENSIONS if dim != 'Year']
+    select_parts.append(f"YEAR({table_column('Date Sold')}) AS `Year`")
+    select_parts += [f"SUM({table_column(col)}) AS `{col}`" for col in SUM_MEASURES]
+    for col in MEAN_MEASURES:
+        select_parts.append(f"SUM({table_column(col)}) AS `{col}`")
+        select_parts.append(f"COUNT({table_column(col)}) AS `{col} count`")
+    select_parts.append("COUNT(*) AS `Rows`")
+
+    where, params = "", []
+    if through is not None:
+        where, params = f" WHERE {table_column(WATERMARK_COLUMN)} <= %s", [through]
+    group_list = ", ".join(str(i + 1) for i in range(len(DIMENSIONS)))
+    return f"SELECT {', '.join(select_parts)} FROM inventory_data{where} GROUP BY {group_list}", params
+
+# Function to build the cube with a single GROUP BY in MySQL
+def build_cube_from_db(through=None):
+    table = read_query(*cube_query(through))
+
+    # MySQL returns SUM as Decimal; convert the measures to plain numbers
+    for col in table.columns:
+        if col not in DIMENSIONS:
+            table[col] = pd.to_numeric(table[col])
+    return RollupCube(optimize_dtypes(table))
+
+
+# Number of dataset versions kept in memory (least recently used are evicted)
+MAX_CACHED_CUBES = 32
+
+_cubes = LRUCache(MAX_CACHED_CUBES)
+
+# Function to get the cube for a dataset version, building it once (shared across sessions)
+def get_cube(version, builder):
+    return _cubes.get_or_build(version, builder)
+
+# Function to drop cached cubes (one dataset version, or all of them)
+def invalidate(version=None):
+    _cubes.invalidate(version)
+
+# Columns a DataFrame needs for build_cube / extend_cube
+CUBE_SOURCE_COLUMNS = [dim for dim in DIMENSIONS if dim != 'Year'] + ['Date Sold'] + SUM_MEASURES + MEAN_MEASURES
+
+# Appended cells are summed into the cube's own cells once they reach this share of the table
+CONSOLIDATE_RATIO = 0.1
+
+# Function to carry a cached cube over to a new dataset version by folding in only the new rows
+# The new rows' cells are appended to the table, and the table is regrouped only now and then
+# Returns None when the old version is not cached (the new cube is then built on first use)
+def extend_cube(old_version, new_version, new_rows):
+    cube = _cubes.peek(old_version)
+    if cube is None:
+        return None
+    delta = build_cube(new_rows.reindex(columns=CUBE_SOURCE_COLUMNS)).table
+    with span('cube.extend', rows=len(delta)):
+        table = concat_rows([cube.table, align_rows(cube.table, delta)])
+        appended = cube.appended + len(delta)
+        if appended > CONSOLIDATE_RATIO * len(table):
+            table, appended = consolidate(table), 0
+    extended = RollupCube(table, appended)
+    _cubes.put(new_version, extended)
+    return extended
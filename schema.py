@@ -0,0 +1,321 @@
+import argparse
+import sys
+from database import get_connection, read_query, fetch_watermark, columns_query, latest_rows_query, \
+    COLUMN_MAP, WATERMARK_COLUMN, ACCOUNT_SQL, WATERMARK_SQL, THRESHOLDS_VERSION_SQL
+from rollup import cube_query
+from sync import SYNC_COLUMNS
+from alerts import ALERT_SOURCE_COLUMNS, KEY_COLUMNS
+from inventory_index import INVENTORY_COLUMNS
+from analytics import report_filters
+
+# Column types of inventory_data (by table column)
+INVENTORY_COLUMN_TYPES = {
+    'Transaction_ID': 'BIGINT NOT NULL AUTO_INCREMENT',
+    'Date_Sold': 'DATE NOT NULL',
+    'Product_ID': 'VARCHAR(64)',
+    'customer_id': 'VARCHAR(64)',
+    'Gender': 'VARCHAR(16)',
+    'Age': 'INT',
+    'Product_Sold': 'VARCHAR(255)',
+    'quantity_sold': 'INT',
+    'price_per_product': 'DOUBLE',
+    'Unit_Cost': 'DOUBLE',
+    'Total_Cost': 'DOUBLE',
+    'Total_Revenue': 'DOUBLE',
+    'Profit': 'DOUBLE',
+    'Availability': 'VARCHAR(32)',
+    'Stock_levels': 'INT',
+    'Reorder_Levels': 'INT',
+    'Order_quantities': 'INT',
+    'Location': 'VARCHAR(128)',
+    'Restock_Date': 'DATE',
+    'Restock_Quantity': 'INT',
+    'invoice_no': 'VARCHAR(64)',
+    'payment_method': 'VARCHAR(32)',
+    'invoice_date': 'DATE',
+    'Purchase_Frequency_Monthly': 'DOUBLE',
+    'Season': 'VARCHAR(16)',
+    'Month': 'VARCHAR(16)',
+    'Restock_Needed': 'VARCHAR(16)',
+    'previous_sales': 'DOUBLE',
+    'sales_moving_avg': 'DOUBLE',
+    'Days_Since_Last_Restock': 'INT',
+    'Sales_Growth_Rate': 'DOUBLE',
+    'Lead_Time': 'INT',
+    'Promotion_Flag': 'TINYINT',
+    'Customer_Segment': 'VARCHAR(64)',
+    'Holiday_Season_Flag': 'TINYINT',
+    'Predicted_Sales': 'DOUBLE',
+    'Current_Stock': 'INT',
+    'Trained_M_Restock_Quantity': 'DOUBLE',
+}
+
+# Secondary and composite indexes on inventory_data for the filters the app uses
+INVENTORY_INDEXES = {
+    'idx_product_id': ['Product_ID'],
+    'idx_product_location': ['Product_Sold', 'Location'],
+    'idx_location_date': ['Location', 'Date_Sold'],
+    'idx_month_season_location': ['Month', 'Season', 'Location'],
+    'idx_segment_month': ['Customer_Segment', 'Month'],
+    'idx_date_sold': ['Date_Sold'],
+}
+
+# Yearly Date_Sold partitions created by the migration; later years are added with add_year_partition
+PARTITION_FIRST_YEAR = 2022
+PARTITION_LAST_YEAR = 2027
+
+
+# Function to build the CREATE TABLE statement for inventory_data
+def create_inventory_table():
+    columns = [f"`{table_col}` {INVENTORY_COLUMN_TYPES[table_col]}" for _, table_col in COLUMN_MAP]
+    # Partitioned tables need the partition column in every unique key; Transaction_ID values stay unique
+    # because they come from AUTO_INCREMENT or from insert_data_from_csv's rekey_rows
+    columns.append("PRIMARY KEY (`Transaction_ID`, `Date_Sold`)")
+    return "CREATE TABLE IF NOT EXISTS inventory_data (\n    {}\n) ENGINE=InnoDB".format(",\n    ".join(columns))
+
+# Function to build the ADD INDEX clauses for inventory_data
+def inventory_index_statement():
+    clauses = [f"ADD INDEX `{name}` ({', '.join(f'`{col}`' for col in cols)})"
+               for name, cols in INVENTORY_INDEXES.items()]
+    return "ALTER TABLE inventory_data " + ", ".join(clauses)
+
+# Function to build yearly RANGE COLUMNS partitions on Date_Sold, plus a catch-all
+def partition_statement(first_year=PARTITION_FIRST_YEAR, last_year=PARTITION_LAST_YEAR):
+    partitions = [f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')" for year in range(first_year, last_year + 1)]
+    partitions.insert(0, f"PARTITION p_before VALUES LESS THAN ('{first_year}-01-01')")
+    partitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+    return "ALTER TABLE inventory_data PARTITION BY RANGE COLUMNS(`Date_Sold`) (\n    {}\n)".format(",\n    ".join(partitions))
+
+# Function to give an inventory_data created before these migrations the key the app relies on:
+# an AUTO_INCREMENT Transaction_ID in a (Transaction_ID, Date_Sold) primary key, which partitioning also needs
+# Does nothing when the table already has that key
+def upgrade_inventory_key(cursor):
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = DATABASE() "
+        "AND TABLE_NAME = 'inventory_data' AND CONSTRAINT_NAME = 'PRIMARY' ORDER BY ORDINAL_POSITION"
+    )
+    primary_key = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT EXTRA FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+        "AND TABLE_NAME = 'inventory_data' AND COLUMN_NAME = 'Transaction_ID'"
+    )
+    row = cursor.fetchone()
+    auto_increment = row is not None and 'auto_increment' in str(row[0]).lower()
+    if primary_key == ['Transaction_ID', 'Date_Sold'] and auto_increment:
+        return
+
+    clauses = ["DROP PRIMARY KEY"] if primary_key else []
+    clauses += [
+        f"MODIFY `Date_Sold` {INVENTORY_COLUMN_TYPES['Date_Sold']}",
+        f"MODIFY `Transaction_ID` {INVENTORY_COLUMN_TYPES['Transaction_ID']}",
+        "ADD PRIMARY KEY (`Transaction_ID`, `Date_Sold`)",
+    ]
+    cursor.execute("ALTER TABLE inventory_data " + ", ".join(clauses))
+
+# Ordered schema migrations: (version, description, steps)
+# A step is a SQL statement or a function called with the cursor
+MIGRATIONS = [
+    (1, "users, datasets and inventory_data tables", [
+        "CREATE TABLE IF NOT EXISTS users ("
+        " username VARCHAR(150) NOT NULL PRIMARY KEY,"
+        " password_hash CHAR(64) NOT NULL"
+        ") ENGINE=InnoDB",
+        "CREATE TABLE IF NOT EXISTS datasets ("
+        " username VARCHAR(150) NOT NULL PRIMARY KEY,"
+        " data LONGTEXT"
+        ") ENGINE=InnoDB",
+        create_inventory_table(),
+        # CREATE TABLE IF NOT EXISTS leaves an existing inventory_data as it was
+        upgrade_inventory_key,
+    ]),
+    (2, "binary dataset storage with format tag, hash and append-only segments", [
+        "ALTER TABLE datasets MODIFY data LONGBLOB,"
+        " ADD COLUMN data_format VARCHAR(32) NULL,"
+        " ADD COLUMN content_hash CHAR(64) NULL,"
+        " ADD COLUMN size_bytes BIGINT NULL",
+        "CREATE TABLE IF NOT EXISTS dataset_segments ("
+        " segment_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,"
+        " username VARCHAR(150) NOT NULL,"
+        " data_format VARCHAR(32) NOT NULL,"
+        " data LONGBLOB NOT NULL,"
+        " row_count INT NOT NULL,"
+        " created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+        " INDEX idx_segments_user (username, segment_id)"
+        ") ENGINE=InnoDB",
+    ]),
+    (3, "per-product reorder thresholds", [
+        "CREATE TABLE IF NOT EXISTS reorder_thresholds ("
+        " Product_Sold VARCHAR(255) NOT NULL,"
+        " Location VARCHAR(128) NOT NULL,"
+        " Reorder_Level DOUBLE NOT NULL,"
+        " updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,"
+        " PRIMARY KEY (Product_Sold, Location)"
+        ") ENGINE=InnoDB",
+    ]),
+    (4, "secondary and composite indexes on inventory_data", [
+        inventory_index_statement(),
+    ]),
+    (5, "RANGE partitioning of inventory_data on Date_Sold", [
+        # Databases that recorded migration 1 before it upgraded the key get it here, before partitioning
+        upgrade_inventory_key,
+        partition_statement(),
+    ]),
+    # thresholds_version() reads MAX(updated_at), so two upserts within one second must not share a timestamp
+    (6, "microsecond reorder_thresholds.updated_at", [
+        "ALTER TABLE reorder_thresholds MODIFY updated_at TIMESTAMP(6) NOT NULL "
+        "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+    ]),
+]
+
+
+# Function to make sure the migrations bookkeeping table exists
+def ensure_migrations_table(cursor):
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INT NOT NULL PRIMARY KEY,"
+        " description VARCHAR(255) NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"
+        ") ENGINE=InnoDB"
+    )
+
+# Function to list the migration versions already applied
+def applied_versions():
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            ensure_migrations_table(cursor)
+            cursor.execute("SELECT version FROM schema_migrations")
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+# Function to apply every pending migration in order; returns the versions applied
+def migrate(target=None):
+    done = applied_versions()
+    applied = []
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for version, description, steps in MIGRATIONS:
+                if version in done or (target is not None and version > target):
+                    continue
+                # MySQL commits DDL implicitly, so each migration is recorded right after it runs
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (version, description))
+                conn.commit()
+                applied.append(version)
+        finally:
+            cursor.close()
+    return applied
+
+# Function to split the catch-all partition so a new year gets its own partition
+def add_year_partition(year):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"ALTER TABLE inventory_data REORGANIZE PARTITION p_future INTO ("
+                f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01'), "
+                f"PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+            )
+        finally:
+            cursor.close()
+
+
+# The app's own queries, built with the same functions the app calls: (name, sql, params, expected index, pruned)
+# An expected index of None means the query reads every row by design, so a full scan is fine
+# pruned marks queries bounded on Date_Sold, which must read fewer partitions than the table has
+def app_queries():
+    mark = fetch_watermark() or 0
+    sample = read_query("SELECT `Month`, `Season`, `Location`, YEAR(`Date_Sold`) AS `Year` FROM inventory_data "
+                        "WHERE `Date_Sold` IS NOT NULL LIMIT 1")
+    month, season, location, year = sample.iloc[0] if len(sample) else ('January', 'Winter', '', PARTITION_FIRST_YEAR)
+    return [
+        ("login (fetch_account)", ACCOUNT_SQL, ('admin',), 'PRIMARY', False),
+        ("watermark (fetch_watermark)", WATERMARK_SQL, (), 'PRIMARY', False),
+        ("incremental refresh (refresh_shared)", *columns_query(SYNC_COLUMNS, after=mark, through=mark), 'PRIMARY',
+         False),
+        ("page load (load_page_data)", *columns_query(INVENTORY_COLUMNS + [WATERMARK_COLUMN], through=mark), None,
+         False),
+        ("rollup cube (build_cube_from_db)", *cube_query(through=mark), None, False),
+        ("alert engine (database_engine)",
+         *latest_rows_query(ALERT_SOURCE_COLUMNS, KEY_COLUMNS, through=mark), None, False),
+        ("row export (iter_columns)", *columns_query(filters=report_filters(month, season, location)),
+         'idx_month_season_location', False),
+        ("row export for a year and location", *columns_query(filters=report_filters(location=location, year=year)),
+         'idx_location_date', True),
+        ("thresholds version", THRESHOLDS_VERSION_SQL, (), None, False),
+    ]
+
+# Function to EXPLAIN the app's queries and report whether they use the expected indexes and prune partitions
+def explain_queries():
+    results = []
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT COUNT(*) AS partition_count FROM information_schema.PARTITIONS "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'inventory_data'")
+            partition_count = cursor.fetchone()['partition_count']
+            for name, sql, params, expected_key, pruned in app_queries():
+                cursor.execute("EXPLAIN " + sql, params)
+                plan = cursor.fetchall()
+                # Derived tables come first in the plan; report the inventory_data access when there is one
+                row = next((step for step in plan if step.get('table') == 'inventory_data'), plan[0] if plan else {})
+                key = row.get('key')
+                partitions = row.get('partitions')
+                key_ok = expected_key is None or key == expected_key or (
+                    # MAX() on the primary key is answered without touching rows
+                    expected_key == 'PRIMARY' and 'Select tables optimized away' in str(row.get('Extra')))
+                partitions_ok = not pruned or (partitions is not None
+                                               and len(str(partitions).split(',')) < partition_count)
+                results.append({
+                    'query': name,
+                    'access': row.get('type'),
+                    'key': key,
+                    'partitions': partitions,
+                    'rows': row.get('rows'),
+                    'ok': key_ok and partitions_ok,
+                })
+        finally:
+            cursor.close()
+    return results
+
+
+# Function to run the schema command line: migrate / status / explain / add-partition
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inventory database schema management")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="apply pending migrations")
+    migrate_parser.add_argument("--target", type=int, help="stop after this version")
+    subparsers.add_parser("status", help="list applied and pending migrations")
+    subparsers.add_parser("explain", help="check that the app's queries use the indexes and prune partitions")
+    partition_parser = subparsers.add_parser("add-partition", help="add a Date_Sold partition for a year")
+    partition_parser.add_argument("year", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        applied = migrate(args.target)
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+    elif args.command == "status":
+        done = applied_versions()
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:>3}  {'applied' if version in done else 'pending':8} {description}")
+    elif args.command == "explain":
+        results = explain_queries()
+        for result in results:
+            print(f"{'OK  ' if result['ok'] else 'MISS'} {result['query']:<46} access={result['access']} "
+                  f"key={result['key']} partitions={result['partitions']} rows={result['rows']}")
+        return 0 if all(result['ok'] for result in results) else 1
+    elif args.command == "add-partition":
+        add_year_partition(args.year)
+        print(f"Added partition p{args.year}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import threading
+import time
+from database import (
+    fetch_columns, fetch_watermark, inventory_version, bump_inventory_version, notify_ingest
+)
+from rollup import extend_cube, CUBE_SOURCE_COLUMNS
+from alerts import ALERT_SOURCE_COLUMNS
+
+# Columns fetched for new rows so the shared cube and alert engine can fold them in
+SYNC_COLUMNS = list(dict.fromkeys(CUBE_SOURCE_COLUMNS + ALERT_SOURCE_COLUMNS))
+
+# High-water mark of inventory_data that the shared (process-wide) aggregates reflect
+_watermark = None
+_watermark_checked = None
+_watermark_lock = threading.Lock()
+
+# Seconds a watermark check is reused by sessions starting up (see refresh_shared's max_age)
+WATERMARK_TTL = 5.0
+
+
+# Function to get the watermark the shared aggregates are built up to (read from the database on first use)
+def shared_watermark():
+    global _watermark, _watermark_checked
+    with _watermark_lock:
+        if _watermark is None:
+            _watermark = fetch_watermark()
+            _watermark_checked = time.monotonic()
+        return _watermark
+
+# Function to fold rows added since the last watermark into the shared cube and alert engine
+# Costs one MAX() lookup plus time proportional to the new rows; returns (rows added, new watermark)
+# With max_age, the lookup is skipped when the watermark was checked less than max_age seconds ago
+def refresh_shared(max_age=None):
+    global _watermark, _watermark_checked
+    old_mark = shared_watermark()
+    with _watermark_lock:
+        if _watermark != old_mark:
+            return 0, _watermark
+        if max_age is not None and time.monotonic() - _watermark_checked < max_age:
+            return 0, old_mark
+        new_mark = fetch_watermark()
+        _watermark_checked = time.monotonic()
+        if new_mark is None or (old_mark is not None and new_mark <= old_mark):
+            return 0, old_mark
+
+        new_rows = fetch_columns(SYNC_COLUMNS, after=old_mark, through=new_mark)
+        old_version = inventory_version()
+        new_version = bump_inventory_version()
+        extend_cube(old_version, new_version, new_rows)
+        notify_ingest(new_rows)
+        _watermark = new_mark
+    return len(new_rows), new_mark
+
+# Function to fetch the rows of a session frame that lie between its watermark and the shared one
+def fetch_session_delta(columns, session_mark, through):
+    if through is None or (session_mark is not None and through <= session_mark):
+        return None
+    return fetch_columns(columns, after=session_mark, through=through)
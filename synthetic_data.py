@@ -0,0 +1,133 @@
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from database import DATAFRAME_COLUMNS
+from loader import MONTH_ORDER
+
+# Category values used by the generator
+LOCATIONS = ['Lagos', 'Abuja', 'Kano', 'Ibadan', 'Port Harcourt', 'Benin City', 'Kaduna', 'Enugu', 'Jos', 'Ilorin',
+             'Owerri', 'Calabar']
+PAYMENT_METHODS = ['Cash', 'Card', 'Bank Transfer', 'Mobile Money']
+CUSTOMER_SEGMENTS = ['Regular', 'Premium', 'Occasional', 'Wholesale']
+PRODUCT_FAMILIES = ['Rice', 'Beans', 'Garri', 'Yam Flour', 'Palm Oil', 'Groundnut Oil', 'Sugar', 'Salt', 'Milk',
+                    'Tea', 'Noodles', 'Spaghetti', 'Tomato Paste', 'Soap', 'Detergent', 'Toothpaste', 'Biscuits',
+                    'Soft Drink', 'Bottled Water', 'Juice']
+SEASONS = ['Winter', 'Spring', 'Summer', 'Autumn']
+SEASON_OF_MONTH = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+# Transactions are spread over this date range
+START_DATE = '2022-01-01'
+DAYS = 3 * 365
+
+
+# Function to pick a product catalogue size for a dataset size (more rows, more distinct products)
+def catalogue_size(rows):
+    return int(min(max(rows // 50, 50), 20000))
+
+# Function to generate one block of inventory rows with the exact 38-column schema
+# Transaction IDs run from first_id; the same seed and sizes always produce the same rows
+def generate_inventory(rows, seed=0, first_id=1, products=None):
+    rng = np.random.default_rng(seed)
+    products = products or catalogue_size(rows)
+
+    # Product catalogue: a name and a base price per product
+    product_names = np.array([f"{PRODUCT_FAMILIES[i % len(PRODUCT_FAMILIES)]} {i // len(PRODUCT_FAMILIES) + 1}"
+                              for i in range(products)], dtype=object)
+    base_price = np.round(rng.uniform(200, 20000, products), 2)
+
+    # Popular products and big cities sell more often
+    product = (rng.zipf(1.3, rows) - 1) % products
+    location = np.minimum(rng.geometric(0.2, rows) - 1, len(LOCATIONS) - 1)
+
+    date_sold = pd.Timestamp(START_DATE) + pd.to_timedelta(rng.integers(0, DAYS, rows), unit='D')
+    month_number = date_sold.month.to_numpy() - 1
+    quantity = rng.integers(1, 21, rows)
+    price = base_price[product]
+    unit_cost = np.round(price * rng.uniform(0.5, 0.85, rows), 2)
+    total_cost = np.round(unit_cost * quantity, 2)
+    revenue = np.round(price * quantity, 2)
+    stock = rng.integers(0, 500, rows)
+    reorder = rng.integers(20, 120, rows)
+    lead_time = rng.integers(1, 30, rows)
+    previous_sales = rng.integers(0, 400, rows)
+    holiday = np.isin(month_number, [10, 11]).astype('int8')
+
+    df = pd.DataFrame({
+        'Transaction ID': np.arange(first_id, first_id + rows, dtype='int64'),
+        'Date Sold': date_sold,
+        'Product ID': pd.Categorical.from_codes(product, [f"P{i:06d}" for i in range(products)]),
+        'customer_id': np.char.add('C', rng.integers(1, max(rows // 5, 10), rows).astype(str)),
+        'Gender': pd.Categorical.from_codes(rng.integers(0, 2, rows), ['Female', 'Male']),
+        'Age': rng.integers(18, 71, rows),
+        'Product Sold': pd.Categorical.from_codes(product, product_names),
+        'quantity sold': quantity,
+        'price per product': price,
+        'Unit Cost': unit_cost,
+        'Total_Cost': total_cost,
+        'Total Revenue': revenue,
+        'Profit': np.round(revenue - total_cost, 2),
+        'Availability': pd.Categorical.from_codes((stock > 0).astype('int8'), ['Out of Stock', 'In Stock']),
+        'Stock levels': stock,
+        'Reorder Levels': reorder,
+        'Order quantities': rng.integers(0, 200, rows),
+        'Location': pd.Categorical.from_codes(location, LOCATIONS),
+        'Restock Date': date_sold + pd.to_timedelta(lead_time, unit='D'),
+        'Restock Quantity': rng.integers(0, 300, rows),
+        'invoice_no': np.char.add('INV', np.arange(first_id, first_id + rows).astype(str)),
+        'payment_method': pd.Categorical.from_codes(rng.integers(0, len(PAYMENT_METHODS), rows), PAYMENT_METHODS),
+        'invoice_date': date_sold,
+        'Purchase Frequency(Monthly)': rng.integers(1, 11, rows),
+        'Season': pd.Categorical.from_codes(SEASON_OF_MONTH[month_number], SEASONS),
+        'Month': pd.Categorical.from_codes(month_number, MONTH_ORDER),
+        'Restock Needed': pd.Categorical.from_codes((stock <= reorder).astype('int8'), ['No', 'Yes']),
+        'previous_sales': previous_sales,
+        'sales_moving_avg': np.round(previous_sales * rng.uniform(0.8, 1.2, rows), 2),
+        'Days Since Last Restock': rng.integers(0, 90, rows),
+        'Sales Growth Rate': np.round(rng.normal(0.02, 0.1, rows), 4),
+        'Lead Time': lead_time,
+        'Promotion Flag': rng.integers(0, 2, rows).astype('int8'),
+        'Customer Segment': pd.Categorical.from_codes(rng.integers(0, len(CUSTOMER_SEGMENTS), rows),
+                                                      CUSTOMER_SEGMENTS),
+        'Holiday Season Flag': holiday,
+        'Predicted Sales': np.round(previous_sales * rng.uniform(0.9, 1.3, rows), 2),
+        'Current Stock': stock,
+        'Trained M.Restock Quantity': np.round(np.maximum(reorder - stock, 0) * rng.uniform(1.0, 1.5, rows), 2),
+    })
+    return df[DATAFRAME_COLUMNS]
+
+# Function to generate a large dataset block by block (keeps peak memory to one block)
+def iter_inventory(rows, chunk_size=1000000, seed=0, first_id=1):
+    products = catalogue_size(rows)
+    for index, offset in enumerate(range(0, rows, chunk_size)):
+        yield generate_inventory(min(chunk_size, rows - offset), seed + index, first_id + offset, products)
+
+# Function to parse a row count such as 10000, 10k or 1M
+def parse_rows(text):
+    text = str(text).strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+# Function to run the generator command line: write a synthetic dataset to .parquet, .csv or .xlsx
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic inventory dataset")
+    parser.add_argument("rows", help="number of rows, e.g. 10k, 1M, 10M")
+    parser.add_argument("output", help="output file (.parquet, .csv or .xlsx)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = parse_rows(args.rows)
+    if args.output.endswith('.csv'):
+        for index, chunk in enumerate(iter_inventory(rows, seed=args.seed)):
+            chunk.to_csv(args.output, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+    elif args.output.endswith('.xlsx'):
+        generate_inventory(rows, args.seed).to_excel(args.output, index=False)
+    else:
+        pd.concat(iter_inventory(rows, seed=args.seed), ignore_index=True).to_parquet(args.output, index=False)
+    print(f"Wrote {rows:,} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from cache import LRUCache
+from database import fetch_thresholds, thresholds_version
+
+
+# Reorder thresholds keyed by (product, location), with product-wide fallbacks, for vectorized lookups
+class ThresholdTable:
+    def __init__(self, thresholds):
+        self.thresholds = thresholds
+        per_location = thresholds[thresholds['Location'].notna()]
+        product_wide = thresholds[thresholds['Location'].isna()]
+        self.by_key = per_location.set_index(['Product Sold', 'Location'])['Reorder Levels'].astype('float64')
+        self.by_product = product_wide.set_index('Product Sold')['Reorder Levels'].astype('float64')
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    # Function to resolve the effective reorder level of many rows at once
+    # Order of precedence: (product, location) threshold, product-wide threshold, the row's own level
+    def lookup(self, products, locations, default):
+        default = np.asarray(default, dtype='float64')
+        if not len(self.thresholds):
+            return default
+
+        products = pd.Index(np.asarray(products, dtype=object))
+        locations = np.asarray(locations, dtype=object)
+
+        result = np.full(len(products), np.nan)
+        if len(self.by_key):
+            positions = self.by_key.index.get_indexer(pd.MultiIndex.from_arrays([products, locations]))
+            found = positions >= 0
+            result[found] = self.by_key.to_numpy()[positions[found]]
+        if len(self.by_product):
+            positions = self.by_product.index.get_indexer(products)
+            fallback = np.isnan(result) & (positions >= 0)
+            result[fallback] = self.by_product.to_numpy()[positions[fallback]]
+        return np.where(np.isnan(result), default, result)
+
+    # Function to get the effective reorder level for every row of an inventory frame
+    # Categorical keys are resolved once per distinct (product, location) pair, not once per row
+    def reorder_levels(self, df):
+        if not len(self.thresholds):
+            return df['Reorder Levels'].to_numpy(dtype='float64')
+        pairs = df[['Product Sold', 'Location']].astype(object)
+        codes, uniques = pd.MultiIndex.from_frame(pairs).factorize()
+        pair_levels = self.lookup(uniques.get_level_values(0), uniques.get_level_values(1), np.nan)
+        levels = np.where(codes >= 0, pair_levels[codes], np.nan)
+        return np.where(np.isnan(levels), df['Reorder Levels'].to_numpy(dtype='float64'), levels)
+
+
+# Function to get a table with no thresholds, so every row keeps its own reorder level
+def empty_thresholds():
+    return ThresholdTable(pd.DataFrame({'Product Sold': [], 'Location': [], 'Reorder Levels': []}))
+
+
+_tables = LRUCache(4)
+
+# Function to get the stored thresholds, reloaded only after they change
+def current_thresholds():
+    return _tables.get_or_build(thresholds_version(), lambda: ThresholdTable(fetch_thresholds()))